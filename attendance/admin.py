@@ -1,17 +1,24 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Student, Lecturer, Course, AttendanceSession, AttendanceRecord
+from .models import (
+    Student, Lecturer, Course, AttendanceSession, AttendanceRecord,
+    CourseAttendanceSummary, StudentCourseAttendance, ExportJob, RosterChange
+)
+from .barcodes import queue_barcodes
+from .cache import invalidate_course_rosters, invalidate_student_rosters, invalidate_user_tokens
+from .rollups import rebuild_course_rollups
 
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
-    list_display = ['student_id', 'first_name', 'last_name', 'email', 'program', 'level', 'is_active', 'barcode_preview']
-    list_filter = ['program', 'level', 'is_active', 'created_at']
+    list_display = ['student_id', 'first_name', 'last_name', 'email', 'program', 'level', 'is_active', 'barcode_status', 'barcode_preview']
+    list_filter = ['program', 'level', 'is_active', 'barcode_status', 'created_at']
     search_fields = ['student_id', 'first_name', 'last_name', 'email', 'barcode_id']
     list_editable = ['is_active']
-    readonly_fields = ['barcode_id', 'barcode_image', 'created_at', 'updated_at', 'barcode_preview']
+    readonly_fields = ['barcode_id', 'barcode_image', 'barcode_status', 'barcode_error', 'created_at', 'updated_at', 'barcode_preview']
     
     fieldsets = (
         ('Basic Information', {
@@ -21,7 +28,7 @@ class StudentAdmin(admin.ModelAdmin):
             'fields': ('program', 'level')
         }),
         ('Barcode Information', {
-            'fields': ('barcode_id', 'barcode_image', 'barcode_preview'),
+            'fields': ('barcode_id', 'barcode_image', 'barcode_preview', 'barcode_status', 'barcode_error'),
             'classes': ('collapse',)
         }),
         ('Status', {
@@ -41,21 +48,48 @@ class StudentAdmin(admin.ModelAdmin):
     
     actions = ['generate_barcodes', 'activate_students', 'deactivate_students']
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_student_rosters(obj.id)
+        if change:
+            RosterChange.record_student_changes([obj.id])
+    
+    def delete_model(self, request, obj):
+        RosterChange.record_student_changes([obj.id], action='removed')
+        invalidate_student_rosters(obj.id)
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        student_ids = list(queryset.values_list('id', flat=True))
+        RosterChange.record_student_changes(student_ids, action='removed')
+        for student_id in student_ids:
+            invalidate_student_rosters(student_id)
+        super().delete_queryset(request, queryset)
+    
     def generate_barcodes(self, request, queryset):
-        for student in queryset:
-            student.generate_barcode()
-            student.save()
-        self.message_user(request, f"Generated barcodes for {queryset.count()} students.")
+        # Rendering is left to the process_barcodes worker so large selections don't block the request
+        queued = queue_barcodes(queryset)
+        self.message_user(request, f"Queued {queued} students for barcode generation.")
     generate_barcodes.short_description = "Generate barcodes for selected students"
     
     def activate_students(self, request, queryset):
+        # Read before the update: a changelist filtered on is_active no longer matches afterwards
+        student_ids = list(queryset.values_list('id', flat=True))
         queryset.update(is_active=True)
-        self.message_user(request, f"Activated {queryset.count()} students.")
+        for student_id in student_ids:
+            invalidate_student_rosters(student_id)
+        RosterChange.record_student_changes(student_ids)
+        self.message_user(request, f"Activated {len(student_ids)} students.")
     activate_students.short_description = "Activate selected students"
     
     def deactivate_students(self, request, queryset):
+        # Read before the update: a changelist filtered on is_active no longer matches afterwards
+        student_ids = list(queryset.values_list('id', flat=True))
         queryset.update(is_active=False)
-        self.message_user(request, f"Deactivated {queryset.count()} students.")
+        for student_id in student_ids:
+            invalidate_student_rosters(student_id)
+        RosterChange.record_student_changes(student_ids)
+        self.message_user(request, f"Deactivated {len(student_ids)} students.")
     deactivate_students.short_description = "Deactivate selected students"
 
 
@@ -74,6 +108,20 @@ class LecturerAdmin(admin.ModelAdmin):
     def get_email(self, obj):
         return obj.user.email
     get_email.short_description = "Email"
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_user_tokens(obj.user_id)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_user_tokens(obj.user_id)
+    
+    def delete_queryset(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            invalidate_user_tokens(user_id)
 
 
 class StudentInline(admin.TabularInline):
@@ -112,6 +160,17 @@ class CourseAdmin(admin.ModelAdmin):
         }),
     )
     
+    def save_related(self, request, form, formsets, change):
+        course = form.instance
+        before = set(course.students.values_list('id', flat=True)) if change else set()
+        super().save_related(request, form, formsets, change)
+        after = set(course.students.values_list('id', flat=True))
+        RosterChange.record(course.id, 'added', after - before)
+        RosterChange.record(course.id, 'removed', before - after)
+        invalidate_course_rosters(course.id)
+        # Ended sessions keep the enrollment they were taken with
+        AttendanceSession.objects.filter(course=course, status='active').refresh_counters()
+    
     def get_students_count(self, obj):
         return obj.students.count()
     get_students_count.short_description = "Enrolled Students"
@@ -170,6 +229,24 @@ class AttendanceSessionAdmin(admin.ModelAdmin):
     
     actions = ['end_sessions']
     
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        AttendanceSession.objects.filter(pk=form.instance.pk).refresh_counters(enrolled=form.instance.status == 'active')
+        # Status or record edits made here bypass end_session()
+        if form.instance.status == 'ended' or form.instance.rolled_up:
+            rebuild_course_rollups(form.instance.course)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        if obj.rolled_up:
+            rebuild_course_rollups(obj.course)
+    
+    def delete_queryset(self, request, queryset):
+        course_ids = set(queryset.filter(rolled_up=True).values_list('course_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for course in Course.objects.filter(pk__in=course_ids):
+            rebuild_course_rollups(course)
+    
     def end_sessions(self, request, queryset):
         active_sessions = queryset.filter(status='active')
         for session in active_sessions:
@@ -208,18 +285,87 @@ class AttendanceRecordAdmin(admin.ModelAdmin):
     
     actions = ['mark_present', 'mark_absent']
     
+    def refresh_session_counters(self, session_ids):
+        sessions = AttendanceSession.objects.filter(pk__in=session_ids)
+        sessions.refresh_counters(enrolled=False)
+        # Corrections to ended sessions must reach the course rollups too
+        for course in Course.objects.filter(pk__in=sessions.filter(rolled_up=True).values('course_id')):
+            rebuild_course_rollups(course)
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.refresh_session_counters([obj.session_id])
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.refresh_session_counters([obj.session_id])
+    
+    def delete_queryset(self, request, queryset):
+        session_ids = set(queryset.values_list('session_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.refresh_session_counters(session_ids)
+    
     def mark_present(self, request, queryset):
         for record in queryset:
             record.mark_present()
+        self.refresh_session_counters(set(queryset.values_list('session_id', flat=True)))
         self.message_user(request, f"Marked {queryset.count()} records as present.")
     mark_present.short_description = "Mark selected records as present"
     
     def mark_absent(self, request, queryset):
-        queryset.update(status='absent', check_in_time=None, scanned_barcode='')
+        queryset.update(status='absent', check_in_time=None, scanned_barcode='', updated_at=timezone.now())
+        self.refresh_session_counters(set(queryset.values_list('session_id', flat=True)))
         self.message_user(request, f"Marked {queryset.count()} records as absent.")
     mark_absent.short_description = "Mark selected records as absent"
 
 
+@admin.register(CourseAttendanceSummary)
+class CourseAttendanceSummaryAdmin(admin.ModelAdmin):
+    list_display = ['course', 'sessions', 'present', 'late', 'absent', 'excused', 'get_average_attendance', 'updated_at']
+    search_fields = ['course__course_code', 'course__course_name']
+    readonly_fields = ['course', 'sessions', 'present', 'late', 'absent', 'excused', 'rate_sum', 'updated_at']
+    
+    def get_average_attendance(self, obj):
+        return f"{obj.average_attendance:.1f}%"
+    get_average_attendance.short_description = "Avg Attendance"
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(StudentCourseAttendance)
+class StudentCourseAttendanceAdmin(admin.ModelAdmin):
+    list_display = ['student', 'course', 'sessions', 'present', 'late', 'absent', 'excused', 'get_attendance_rate']
+    list_filter = ['course']
+    search_fields = ['student__student_id', 'student__first_name', 'student__last_name', 'course__course_code']
+    readonly_fields = ['student', 'course', 'sessions', 'present', 'late', 'absent', 'excused', 'updated_at']
+    
+    def get_attendance_rate(self, obj):
+        return f"{obj.attendance_rate:.1f}%"
+    get_attendance_rate.short_description = "Attendance Rate"
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['job_id', 'course', 'start_date', 'end_date', 'requested_by', 'status', 'get_progress', 'created_at']
+    list_filter = ['status', 'compress', 'created_at']
+    search_fields = ['job_id', 'course__course_code', 'requested_by__username']
+    readonly_fields = [
+        'job_id', 'requested_by', 'course', 'start_date', 'end_date', 'compress', 'params_hash', 'status',
+        'total_rows', 'rows_written', 'file', 'error', 'created_at', 'started_at', 'finished_at', 'updated_at'
+    ]
+    
+    def get_progress(self, obj):
+        return f"{obj.progress}%"
+    get_progress.short_description = "Progress"
+    
+    def has_add_permission(self, request):
+        return False
+
+
 # Customize admin site
 admin.site.site_header = "ATU Barcode Attendance System"
 admin.site.site_title = "ATU Attendance Admin"
@@ -0,0 +1,34 @@
+"""
+API authentication.
+"""
+import copy
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication backed by the in-process ``token_cache``.
+
+    A miss loads the token, its user and the user's lecturer profile in one
+    query; a hit costs no query at all, and ``request.user.lecturer`` is
+    already loaded either way.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            try:
+                token = Token.objects.select_related('user', 'user__lecturer').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed('User inactive or deleted.')
+            token_cache.set(key, token)
+
+        # Each request gets its own user instance; the cached one is shared
+        return copy.copy(token.user), token
@@ -0,0 +1,107 @@
+"""
+Deferred barcode image generation.
+
+Students are saved with ``barcode_status='pending'`` and no image. The
+``process_barcodes`` command drains that queue in batches: rows are claimed
+with ``SKIP LOCKED`` so several workers can run side by side, QR codes are
+rendered across a process pool, and each batch is written back with a
+single bulk update.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from .models import Student, RosterChange
+from .qr import try_render_qr
+
+
+BATCH_SIZE = 200
+
+
+def barcode_counts():
+    """Number of students whose barcode image is pending and failed, in one query"""
+    return Student.objects.aggregate(
+        pending=Count('pk', filter=Q(barcode_status='pending')),
+        failed=Count('pk', filter=Q(barcode_status='failed')),
+    )
+
+
+def queue_barcodes(queryset):
+    """Queue the images of these students to be rendered again; returns how many were queued"""
+    return queryset.update(barcode_status='pending', barcode_error='')
+
+
+def retry_failed():
+    """Queue failed barcodes again; returns how many were queued"""
+    return queue_barcodes(Student.objects.filter(barcode_status='failed'))
+
+
+@contextmanager
+def render_pool(workers, batch_size=None):
+    """
+    A ``map`` function rendering across ``workers`` processes.
+
+    Maps of ``batch_size`` items are sent to the workers a few chunks each;
+    without one every item is a task of its own. With no workers it is the
+    builtin ``map``, rendering in this process.
+    """
+    if not workers:
+        yield map
+        return
+    chunksize = max(1, batch_size // (workers * 4)) if batch_size else 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield lambda func, items: executor.map(func, items, chunksize=chunksize)
+
+
+def process_pending_barcodes(batch_size=BATCH_SIZE, map_func=map):
+    """
+    Render and store one batch of pending barcodes.
+
+    ``map_func`` renders the batch; pass ``Executor.map`` of a process pool
+    to spread it across cores. Returns ``(ready, failed)`` counts, both zero
+    once the queue is empty.
+    """
+    field = Student._meta.get_field('barcode_image')
+    with transaction.atomic():
+        students = list(
+            Student.objects.select_for_update(skip_locked=True)
+            .filter(barcode_status='pending')
+            .order_by('id')
+            .only('id', 'student_id', 'barcode_id', 'barcode_image', 'updated_at')[:batch_size]
+        )
+        if not students:
+            return 0, 0
+
+        now = timezone.now()
+        replaced = []
+        ready = []
+        for student, (data, error) in zip(students, map_func(try_render_qr, [s.barcode_id for s in students])):
+            if error is None:
+                try:
+                    name = field.generate_filename(student, f'barcode_{student.student_id}.png')
+                    old_name = student.barcode_image.name
+                    student.barcode_image = field.storage.save(name, ContentFile(data), max_length=field.max_length)
+                    if old_name:
+                        replaced.append(old_name)
+                except OSError as e:
+                    error = f'{type(e).__name__}: {e}'
+            student.updated_at = now
+            if error is None:
+                student.barcode_status = 'ready'
+                student.barcode_error = ''
+                ready.append(student.id)
+            else:
+                student.barcode_status = 'failed'
+                student.barcode_error = error
+        Student.objects.bulk_update(students, ['barcode_image', 'barcode_status', 'barcode_error', 'updated_at'])
+
+    # Old images are only removed once nothing refers to them
+    for name in replaced:
+        field.storage.delete(name)
+    # New images change barcode_image_url in roster deltas
+    RosterChange.record_student_changes(ready)
+    return len(ready), len(students) - len(ready)
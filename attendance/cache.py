@@ -0,0 +1,160 @@
+"""
+In-process caches used on the attendance hot paths.
+
+Each worker process keeps its own copy, so every cache is bounded in size
+and entries expire after a TTL to pick up changes made by other workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with an optional per-entry TTL."""
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires = item
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def discard_where(self, predicate):
+        """Remove every entry for which ``predicate(key, value)`` is true"""
+        with self._lock:
+            stale = [key for key, (value, _) in self._data.items() if predicate(key, value)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class SessionRoster:
+    """
+    Snapshot of an active session and its enrollment.
+
+    ``students`` maps the barcode of every active enrolled student to a
+    ``(pk, student_id)`` pair; ``enrolled`` holds the pk of every enrolled
+    student, active or not.
+    """
+    __slots__ = ('session', 'students', 'enrolled')
+
+    def __init__(self, session, students, enrolled):
+        self.session = session
+        self.students = students
+        self.enrolled = enrolled
+
+    @classmethod
+    def load(cls, session_id):
+        from .models import AttendanceSession
+
+        session = AttendanceSession.objects.select_related('course').filter(
+            session_id=session_id, status='active'
+        ).first()
+        if session is None:
+            return None
+
+        rows = session.course.students.order_by().values_list('pk', 'barcode_id', 'student_id', 'is_active')
+        students = {barcode_id: (pk, student_id) for pk, barcode_id, student_id, is_active in rows if is_active}
+        enrolled = {row[0] for row in rows}
+        return cls(session, students, enrolled)
+
+
+roster_cache = LRUCache(
+    maxsize=getattr(settings, 'ROSTER_CACHE_SIZE', 256),
+    ttl=getattr(settings, 'ROSTER_CACHE_TTL', 60),
+)
+
+
+# Repeat scans of the same student within the window return the first result
+# without a query. Only an optimisation: it is per process, and the check-in
+# upsert itself never overwrites an existing check-in.
+scan_debounce = LRUCache(
+    maxsize=getattr(settings, 'SCAN_DEBOUNCE_CACHE_SIZE', 20000),
+    ttl=getattr(settings, 'SCAN_DEBOUNCE_SECONDS', 120),
+)
+
+# API token key -> Token, with its user and the user's lecturer loaded
+token_cache = LRUCache(
+    maxsize=getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 60),
+)
+
+# Responses of requests sent with an Idempotency-Key header
+idempotent_responses = LRUCache(
+    maxsize=getattr(settings, 'IDEMPOTENCY_CACHE_SIZE', 20000),
+    ttl=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60),
+)
+
+
+def get_session_roster(session_id):
+    """Return the cached roster of an active session, loading it on a miss"""
+    roster = roster_cache.get(session_id)
+    if roster is None:
+        roster = SessionRoster.load(session_id)
+        if roster is not None:
+            roster_cache.set(session_id, roster)
+    return roster
+
+
+def invalidate_session_roster(session_id):
+    roster_cache.pop(session_id)
+
+
+def invalidate_course_rosters(course_id):
+    roster_cache.discard_where(lambda key, roster: roster.session.course_id == course_id)
+
+
+def invalidate_student_rosters(student_id):
+    roster_cache.discard_where(lambda key, roster: student_id in roster.enrolled)
+
+
+def invalidate_user_tokens(user_id):
+    token_cache.discard_where(lambda key, token: token.user_id == user_id)
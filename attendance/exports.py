@@ -0,0 +1,217 @@
+"""
+Streaming CSV exports.
+
+Every export is driven by a single join query iterated in chunks (a
+server-side cursor on PostgreSQL), and rows are written to the response as
+they are produced, so memory stays flat whatever the size of the export.
+"""
+import csv
+import gzip
+import heapq
+import os
+import tempfile
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Exists, OuterRef
+from django.core.files import File
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Student, Lecturer, Course, AttendanceRecord, ExportJob
+from .reports import count_subquery, with_status_counts
+
+
+CHUNK_SIZE = 2000
+
+ATTENDANCE_FIELDS = [
+    'session_id', 'session__date', 'session__session_name',
+    'session__course__course_code', 'session__course__course_name',
+    'session__lecturer__user__first_name', 'session__lecturer__user__last_name',
+    'student__student_id', 'student__first_name', 'student__last_name',
+    'status', 'check_in_time',
+]
+
+ATTENDANCE_HEADER = [
+    'Date', 'Course Code', 'Course Name', 'Session Name', 'Student ID', 'Student Name', 'Status', 'Check-in Time', 'Lecturer'
+]
+
+# Export jobs report progress (and so stay claimed) every this many rows
+PROGRESS_EVERY = 5000
+
+
+class Echo:
+    """File-like object that hands back what is written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+async def _async_lines(lines, batch=500):
+    lines = iter(lines)
+    next_batch = sync_to_async(lambda: ''.join(islice(lines, batch)), thread_sensitive=True)
+    while chunk := await next_batch():
+        yield chunk
+
+
+def streaming_csv_response(request, filename, header, rows):
+    """
+    Stream ``rows`` as a CSV attachment.
+
+    Under ASGI the rows are pulled through an async iterator, since Django
+    would otherwise buffer a synchronous iterator before sending it.
+    """
+    lines = csv_lines(header, rows)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        lines = _async_lines(lines)
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def attendance_rows(sessions, newest_first=False):
+    """
+    Yield one dict per (session, student) for the given sessions.
+
+    Stored records come from one join query. Absences that are not stored
+    come from a second query over enrollment x sessions. The two streams are
+    merged so the rows of each session stay together, ordered by session
+    date.
+    """
+    direction = '-' if newest_first else ''
+    sessions = sessions.order_by()
+
+    stored = AttendanceRecord.objects.filter(session__in=sessions).order_by(
+        f'{direction}session__date', 'session_id', 'student__student_id'
+    ).values(*ATTENDANCE_FIELDS)
+
+    has_record = AttendanceRecord.objects.filter(
+        session=OuterRef('course__attendance_sessions'), student=OuterRef('student_id')
+    )
+    derived = Course.students.through.objects.filter(
+        course__attendance_sessions__in=sessions.filter(roster_materialized=False)
+    ).exclude(Exists(has_record)).order_by(
+        f'{direction}course__attendance_sessions__date', 'course__attendance_sessions__id', 'student__student_id'
+    ).values(
+        'course__attendance_sessions', 'course__attendance_sessions__date',
+        'course__attendance_sessions__session_name', 'course__course_code', 'course__course_name',
+        'course__attendance_sessions__lecturer__user__first_name',
+        'course__attendance_sessions__lecturer__user__last_name',
+        'student__student_id', 'student__first_name', 'student__last_name',
+    )
+
+    def derived_rows():
+        for row in derived.iterator(chunk_size=CHUNK_SIZE):
+            values = list(row.values()) + ['absent', None]
+            yield dict(zip(ATTENDANCE_FIELDS, values))
+
+    def sort_key(row):
+        day = row['session__date'].toordinal()
+        return (-day if newest_first else day, row['session_id'])
+
+    return heapq.merge(stored.iterator(chunk_size=CHUNK_SIZE), derived_rows(), key=sort_key)
+
+
+def attendance_export_rows(sessions):
+    """Rows of the full attendance export, matching ``ATTENDANCE_HEADER``"""
+    for row in attendance_rows(sessions, newest_first=True):
+        yield [
+            row['session__date'].strftime('%Y-%m-%d'),
+            row['session__course__course_code'],
+            row['session__course__course_name'],
+            row['session__session_name'] or f"Session {row['session__date']}",
+            row['student__student_id'],
+            f"{row['student__first_name']} {row['student__last_name']}",
+            row['status'].title(),
+            row['check_in_time'].strftime('%Y-%m-%d %H:%M:%S') if row['check_in_time'] else '',
+            f"{row['session__lecturer__user__first_name']} {row['session__lecturer__user__last_name']}",
+        ]
+
+
+def run_export_job(job):
+    """
+    Write the export of a claimed job to a temporary file, then store it.
+
+    Progress is saved every ``PROGRESS_EVERY`` rows; any error marks the job
+    as failed.
+    """
+    jobs = ExportJob.objects.filter(pk=job.pk)
+    sessions = job.sessions()
+    job.total_rows = sum(session.n_total for session in with_status_counts(sessions.order_by()))
+    jobs.update(total_rows=job.total_rows, updated_at=timezone.now())
+
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        opener = gzip.open if job.compress else open
+        with opener(path, 'wt', newline='', encoding='utf-8') as out:
+            writer = csv.writer(out)
+            writer.writerow(ATTENDANCE_HEADER)
+            written = 0
+            for row in attendance_export_rows(sessions):
+                writer.writerow(row)
+                written += 1
+                if written % PROGRESS_EVERY == 0:
+                    jobs.update(rows_written=written, updated_at=timezone.now())
+        job.rows_written = written
+
+        with open(path, 'rb') as artifact:
+            job.file.save(job.filename, File(artifact), save=False)
+        job.status = 'done'
+    except Exception as exc:
+        job.status = 'failed'
+        job.error = str(exc)
+    finally:
+        os.remove(path)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'error', 'total_rows', 'rows_written', 'finished_at', 'updated_at'])
+    return job
+
+
+def student_rows():
+    students = Student.objects.filter(is_active=True).order_by('student_id').values_list(
+        'student_id', 'first_name', 'last_name', 'email', 'program', 'level', 'is_active', 'created_at'
+    )
+    for student_id, first_name, last_name, email, program, level, is_active, created_at in students.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            student_id, first_name, last_name, email, program, level,
+            'Active' if is_active else 'Inactive',
+            created_at.strftime('%Y-%m-%d'),
+        ]
+
+
+def lecturer_rows():
+    lecturers = Lecturer.objects.order_by('lecturer_id').values_list(
+        'lecturer_id', 'user__first_name', 'user__last_name', 'user__email', 'user__username',
+        'department', 'user__is_active', 'created_at'
+    )
+    for lecturer_id, first_name, last_name, email, username, department, is_active, created_at in lecturers.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            lecturer_id, first_name, last_name, email, username, department,
+            'Active' if is_active else 'Inactive',
+            created_at.strftime('%Y-%m-%d'),
+        ]
+
+
+def course_rows():
+    enrollment = Course.students.through.objects.filter(course_id=OuterRef('pk'))
+    courses = Course.objects.filter(is_active=True).order_by('course_code').annotate(
+        enrolled=count_subquery(enrollment, 'course_id')
+    ).values_list(
+        'course_code', 'course_name', 'lecturer__user__first_name', 'lecturer__user__last_name',
+        'lecturer__department', 'credit_hours', 'semester', 'academic_year', 'enrolled', 'is_active'
+    )
+    for code, name, first_name, last_name, department, credit_hours, semester, year, enrolled, is_active in courses.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            code, name, f"{first_name} {last_name}", department, credit_hours, semester, year, enrolled,
+            'Active' if is_active else 'Inactive',
+        ]
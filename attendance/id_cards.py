@@ -0,0 +1,188 @@
+"""
+Printable A4 sheets of student ID cards.
+
+Each card carries a student's QR code, drawn as vector rectangles from its
+module runs, so nothing is rasterised and a code prints sharp at any size.
+Encoding the QR codes is the slow part: it is done once per student, in
+chunks of pages spread across a process pool, while the PDF is drawn
+straight to the output file.
+
+Runs too large to render inside a web request are queued as export jobs
+and written by the export worker (see ``run_barcode_sheets_job()``).
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from .barcodes import render_pool
+from .models import Student, ExportJob
+from .qr import module_runs, qr_matrix
+
+
+SHEET_TITLE = 'ATU Attendance System'
+
+# ID-1 (credit card) sized cards, 2 x 5 to an A4 page
+PAGE_WIDTH, PAGE_HEIGHT = A4
+CARD_WIDTH = 85.6 * mm
+CARD_HEIGHT = 54 * mm
+COLUMNS, ROWS = 2, 5
+CARDS_PER_PAGE = COLUMNS * ROWS
+GAP = 3 * mm
+PADDING = 3 * mm
+MARGIN_X = (PAGE_WIDTH - COLUMNS * CARD_WIDTH - (COLUMNS - 1) * GAP) / 2
+MARGIN_Y = (PAGE_HEIGHT - ROWS * CARD_HEIGHT - (ROWS - 1) * GAP) / 2
+
+# Cards encoded per task of the process pool
+PAGES_PER_CHUNK = 5
+CHUNK_SIZE = PAGES_PER_CHUNK * CARDS_PER_PAGE
+
+CARD_FIELDS = ['student_id', 'first_name', 'last_name', 'program', 'level', 'barcode_id']
+
+
+def card_students(course_id=None, program=None, level=None, include_inactive=False):
+    """Rows of ``CARD_FIELDS`` for the selected students, in student ID order"""
+    students = Student.objects.all() if include_inactive else Student.objects.filter(is_active=True)
+    if course_id:
+        students = students.filter(courses=course_id)
+    if program:
+        students = students.filter(program=program)
+    if level:
+        students = students.filter(level=level)
+    return students.order_by('student_id').values_list(*CARD_FIELDS)
+
+
+def encode_chunk(barcode_ids):
+    """
+    ``(modules, runs)`` of each barcode, ``runs`` packing its dark module
+    runs as ``(x, y, length)`` bytes, or None if it cannot be encoded.
+
+    Compact enough to send back from a worker process cheaply.
+    """
+    codes = []
+    for barcode_id in barcode_ids:
+        try:
+            matrix = qr_matrix(barcode_id)
+        except Exception:
+            codes.append(None)
+            continue
+        codes.append((len(matrix), bytes(value for run in module_runs(matrix) for value in run)))
+    return codes
+
+
+def _fit(text, font, size, width):
+    """``text`` cut down with an ellipsis to fit ``width`` points"""
+    if stringWidth(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + '…', font, size) > width:
+        text = text[:-1]
+    return text + '…'
+
+
+def _draw_qr(pdf, x, y, size, code):
+    modules, runs = code
+    module = size / modules
+    path = pdf.beginPath()
+    for i in range(0, len(runs), 3):
+        mx, my, length = runs[i:i + 3]
+        path.rect(x + mx * module, y + (modules - my - 1) * module, length * module, module)
+    pdf.setFillColorRGB(0, 0, 0)
+    pdf.drawPath(path, stroke=0, fill=1)
+
+
+def _draw_card(pdf, slot, student, code):
+    student_id, first_name, last_name, program, level, barcode_id = student
+    column, row = slot % COLUMNS, slot // COLUMNS
+    x = MARGIN_X + column * (CARD_WIDTH + GAP)
+    y = PAGE_HEIGHT - MARGIN_Y - (row + 1) * CARD_HEIGHT - row * GAP
+
+    # Cutting guide
+    pdf.setStrokeColorRGB(0.75, 0.75, 0.75)
+    pdf.setLineWidth(0.5)
+    pdf.roundRect(x, y, CARD_WIDTH, CARD_HEIGHT, 3 * mm, stroke=1, fill=0)
+
+    qr_size = CARD_HEIGHT - 2 * PADDING
+    if code is None:
+        pdf.setFillColorRGB(0.6, 0, 0)
+        pdf.setFont('Helvetica', 7)
+        pdf.drawCentredString(x + PADDING + qr_size / 2, y + CARD_HEIGHT / 2, 'QR code unavailable')
+    else:
+        _draw_qr(pdf, x + PADDING, y + PADDING, qr_size, code)
+
+    text_x = x + 2 * PADDING + qr_size
+    width = x + CARD_WIDTH - PADDING - text_x
+    lines = [
+        ('Helvetica', 6.5, (0.4, 0.4, 0.4), SHEET_TITLE),
+        ('Helvetica-Bold', 10, (0, 0, 0), f'{first_name} {last_name}'),
+        ('Helvetica', 9, (0, 0, 0), student_id),
+        ('Helvetica', 7.5, (0.25, 0.25, 0.25), program),
+        ('Helvetica', 7.5, (0.25, 0.25, 0.25), f'Level {level}'),
+    ]
+    line_y = y + CARD_HEIGHT - PADDING - 8
+    for font, size, color, text in lines:
+        pdf.setFont(font, size)
+        pdf.setFillColorRGB(*color)
+        pdf.drawString(text_x, line_y, _fit(text, font, size, width))
+        line_y -= size + 5
+
+
+def write_barcode_sheets(out, students, map_func=map):
+    """
+    Draw a card for each row of ``students`` (see ``card_students()``) to
+    the file or path ``out``; returns the number of pages.
+
+    QR codes are encoded a chunk of pages at a time by ``map_func``; pass
+    ``Executor.map`` of a process pool to spread them across cores.
+    """
+    students = list(students)
+    chunks = [students[i:i + CHUNK_SIZE] for i in range(0, len(students), CHUNK_SIZE)]
+    pdf = canvas.Canvas(out, pagesize=A4, pageCompression=1)
+    pdf.setTitle(f'{SHEET_TITLE} - Student QR codes')
+
+    cards = 0
+    encoded = map_func(encode_chunk, [[row[-1] for row in chunk] for chunk in chunks])
+    for chunk, codes in zip(chunks, encoded):
+        for student, code in zip(chunk, codes):
+            slot = cards % CARDS_PER_PAGE
+            if cards and not slot:
+                pdf.showPage()
+            _draw_card(pdf, slot, student, code)
+            cards += 1
+    pdf.save()
+    return -(-cards // CARDS_PER_PAGE)
+
+
+def run_barcode_sheets_job(job):
+    """
+    Write the barcode sheets of a claimed export job to a temporary file,
+    then store it; any error marks the job as failed.
+
+    Runs of more than one chunk are encoded across a pool of
+    ``BARCODE_WORKERS`` processes.
+    """
+    students = list(card_students(job.course_id, job.program, job.level))
+    job.total_rows = len(students)
+    ExportJob.objects.filter(pk=job.pk).update(total_rows=job.total_rows, updated_at=timezone.now())
+
+    workers = (getattr(settings, 'BARCODE_WORKERS', None) or os.cpu_count()) if len(students) > CHUNK_SIZE else 0
+    with tempfile.TemporaryFile() as output:
+        try:
+            with render_pool(workers) as map_func:
+                write_barcode_sheets(output, students, map_func)
+            output.seek(0)
+            job.file.save(job.filename, File(output), save=False)
+            job.rows_written = len(students)
+            job.status = 'done'
+        except Exception as exc:
+            job.status = 'failed'
+            job.error = str(exc)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'error', 'total_rows', 'rows_written', 'finished_at', 'updated_at'])
+    return job
@@ -0,0 +1,90 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef
+
+from attendance.models import Student, Lecturer, Course, AttendanceSession
+from attendance.reports import count_subquery
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the course_list and student_list queries against join-based aggregation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=8, help='Courses taught by the lecturer')
+        parser.add_argument('--students', type=int, default=300, help='Students enrolled in each course')
+        parser.add_argument('--sessions', type=int, default=40, help='Sessions held by each course')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per query (best is reported)')
+
+    def handle(self, *args, **options):
+        # Everything is created in a transaction that is rolled back at the end
+        with transaction.atomic():
+            lecturer = self._make_fixture(options['courses'], options['students'], options['sessions'])
+            courses = Course.objects.filter(lecturer=lecturer, is_active=True)
+
+            joined = courses.annotate(total_students=Count('students'), total_sessions=Count('attendance_sessions'))
+            subqueries = courses.annotate(
+                total_students=count_subquery(Course.students.through.objects.filter(course_id=OuterRef('pk')), 'course_id'),
+                total_sessions=count_subquery(AttendanceSession.objects.filter(course_id=OuterRef('pk')), 'course_id'),
+            )
+            distinct = Student.objects.filter(
+                courses__in=courses.values_list('id', flat=True), is_active=True
+            ).distinct()
+            exists = Student.objects.filter(Exists(Course.students.through.objects.filter(
+                student_id=OuterRef('pk'), course__lecturer=lecturer, course__is_active=True
+            )), is_active=True)
+
+            self.stdout.write(f"{'query':<34}  {'ms':>8}  result")
+            for label, queryset in [
+                ('course_list, Count() joins', joined),
+                ('course_list, subqueries', subqueries),
+                ('student_list, join + DISTINCT', distinct),
+                ('student_list, EXISTS', exists),
+            ]:
+                elapsed, result = self._time(queryset, options['repeat'])
+                self.stdout.write(f"{label:<34}  {elapsed:>8.1f}  {result}")
+
+            transaction.set_rollback(True)
+
+    def _time(self, queryset, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = list(queryset.order_by())
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        if rows and hasattr(rows[0], 'total_students'):
+            first = rows[0]
+            return best, f"{first.course_code}: {first.total_students} students, {first.total_sessions} sessions"
+        return best, f"{len(rows)} students"
+
+    def _make_fixture(self, n_courses, n_students, n_sessions):
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'bench-{tag}')
+        lecturer = Lecturer.objects.create(user=user, lecturer_id=f'B-{tag}', department='Benchmark')
+        students = Student.objects.bulk_create([
+            Student(
+                student_id=f'{tag}-{i}', barcode_id=str(uuid.uuid4()), first_name='Bench',
+                last_name=str(i), email=f'{tag}-{i}@example.com', program='Benchmark', level='100'
+            )
+            for i in range(n_students * 2)
+        ])
+        for c in range(n_courses):
+            course = Course.objects.create(
+                course_code=f'B-{tag}-{c}', course_name='Benchmark', lecturer=lecturer,
+                semester='Benchmark', academic_year='0000'
+            )
+            # Courses overlap by half their students, as real programmes do
+            offset = (c % 2) * (n_students // 2)
+            course.students.add(*students[offset:offset + n_students])
+            AttendanceSession.objects.bulk_create([
+                AttendanceSession(
+                    session_id=str(uuid.uuid4()), course=course, lecturer=lecturer, status='ended',
+                    enrolled_count=n_students
+                )
+                for _ in range(n_sessions)
+            ])
+        return lecturer
@@ -0,0 +1,54 @@
+import time
+import uuid
+from io import BytesIO
+
+import qrcode
+from django.core.management.base import BaseCommand
+
+from attendance import qr
+
+
+class Command(BaseCommand):
+    help = 'Benchmark QR rendering from the module matrix against qrcode.make_image()'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help='Barcodes rendered per renderer')
+        parser.add_argument('--size', type=int, default=qr.DEFAULT_SIZE, help='Pixels per module')
+
+    def handle(self, *args, **options):
+        size = options['size']
+        barcodes = [str(uuid.uuid4()) for _ in range(options['count'])]
+
+        def make_image(barcode_id):
+            # The previous rendering: qrcode's search of all eight masks, then a PIL box per module
+            code = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=size, border=4)
+            code.add_data(barcode_id)
+            code.make(fit=True)
+            img = code.make_image(fill_color="black", back_color="white")
+            buffer = BytesIO()
+            img.save(buffer, 'PNG')
+            return buffer.getvalue()
+
+        _, encode_ms = self._time(lambda barcode_id: qr.make_qr(barcode_id, size), barcodes)
+        self.stdout.write(
+            f"{len(barcodes)} barcodes, {size} px per module; encoding with mask {qr.MASK_PATTERN} "
+            f"takes {encode_ms / len(barcodes):.2f} ms each"
+        )
+        self.stdout.write(f"{'renderer':<26}  {'ms each':>7}  {'speedup':>7}  {'avg bytes':>9}")
+        baseline = None
+        for label, render in [
+            ('make_image() PNG', make_image),
+            ('matrix PNG (1-bit)', lambda barcode_id: qr.render_qr(barcode_id, size, 'png')),
+            ('matrix SVG', lambda barcode_id: qr.render_qr(barcode_id, size, 'svg')),
+        ]:
+            outputs, elapsed = self._time(render, barcodes)
+            baseline = baseline or elapsed
+            average = sum(len(output) for output in outputs) / len(outputs)
+            self.stdout.write(
+                f"{label:<26}  {elapsed / len(barcodes):>7.2f}  {baseline / elapsed:>6.1f}x  {average:>9.0f}"
+            )
+
+    def _time(self, func, items):
+        started = time.perf_counter()
+        results = [func(item) for item in items]
+        return results, (time.perf_counter() - started) * 1000
@@ -0,0 +1,69 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from attendance.models import Student, Lecturer, Course, AttendanceSession, AttendanceRecord
+
+
+class Command(BaseCommand):
+    help = 'Benchmark roster materialization when starting a session, by class size'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[50, 100, 250, 500, 1000, 2000],
+            help='Class sizes to benchmark'
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per class size (best is reported)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'students':>8}  {'per-row ms':>10}  {'queries':>7}  {'bulk ms':>8}  {'queries':>7}  {'speedup':>7}")
+
+        for size in options['sizes']:
+            legacy = min((self._run(size, self._create_per_row) for _ in range(options['repeat'])), key=lambda r: r[0])
+            bulk = min((self._run(size, self._create_bulk) for _ in range(options['repeat'])), key=lambda r: r[0])
+            self.stdout.write(
+                f"{size:>8}  {legacy[0]:>10.1f}  {legacy[1]:>7}  {bulk[0]:>8.1f}  {bulk[1]:>7}  {legacy[0] / bulk[0]:>6.1f}x"
+            )
+
+    def _run(self, size, start_session):
+        """Time ``start_session`` for a fresh course of ``size`` students, then roll everything back"""
+        with transaction.atomic():
+            course = self._make_course(size)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                with transaction.atomic():
+                    session = AttendanceSession.objects.create(course=course, lecturer=course.lecturer)
+                    start_session(session)
+                elapsed = (time.perf_counter() - started) * 1000
+            assert session.attendance_records.count() == size
+            transaction.set_rollback(True)
+        return elapsed, len(queries)
+
+    def _create_per_row(self, session):
+        for student in session.course.students.all():
+            AttendanceRecord.objects.create(session=session, student=student, status='absent')
+
+    def _create_bulk(self, session):
+        session.materialize_roster()
+
+    def _make_course(self, size):
+        tag = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(username=f'bench-{tag}')
+        lecturer = Lecturer.objects.create(user=user, lecturer_id=f'B-{tag}', department='Benchmark')
+        course = Course.objects.create(
+            course_code=f'B-{tag}', course_name='Benchmark', lecturer=lecturer,
+            semester='Benchmark', academic_year='0000'
+        )
+        students = Student.objects.bulk_create([
+            Student(
+                student_id=f'{tag}-{i}', barcode_id=str(uuid.uuid4()), first_name='Bench',
+                last_name=str(i), email=f'{tag}-{i}@example.com', program='Benchmark', level='100'
+            )
+            for i in range(size)
+        ])
+        course.students.add(*students)
+        return course
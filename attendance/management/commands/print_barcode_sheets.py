@@ -0,0 +1,41 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.barcodes import render_pool
+from attendance.id_cards import CHUNK_SIZE, card_students, write_barcode_sheets
+from attendance.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Write printable A4 sheets of student ID cards with their QR codes to a PDF'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', help='Only students enrolled in this course code')
+        parser.add_argument('--program', help='Only students in this program')
+        parser.add_argument('--level', help='Only students at this level')
+        parser.add_argument('--include-inactive', action='store_true', help='Include deactivated students')
+        parser.add_argument('--output', default='barcode_sheets.pdf', help='Path of the PDF to write')
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'BARCODE_WORKERS', None) or os.cpu_count(),
+            help='QR encoding processes (0 encodes in this process)'
+        )
+
+    def handle(self, *args, **options):
+        course_id = None
+        if options['course']:
+            course_id = Course.objects.filter(course_code=options['course']).values_list('id', flat=True).first()
+            if course_id is None:
+                raise CommandError(f"Course {options['course']} does not exist.")
+
+        students = list(card_students(course_id, options['program'], options['level'], options['include_inactive']))
+        if not students:
+            raise CommandError('No students match.')
+
+        workers = options['workers'] if len(students) > CHUNK_SIZE else 0
+        with render_pool(workers) as map_func:
+            pages = write_barcode_sheets(options['output'], students, map_func)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(students)} cards on {pages} pages to {options['output']}."
+        ))
@@ -0,0 +1,49 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from attendance.barcodes import barcode_counts, process_pending_barcodes, render_pool, retry_failed
+
+
+class Command(BaseCommand):
+    help = 'Render and store pending student barcode images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument(
+            '--interval', type=float, default=getattr(settings, 'BARCODE_WORKER_POLL_INTERVAL', 5),
+            help='Seconds to wait between checks of an empty queue'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=getattr(settings, 'BARCODE_BATCH_SIZE', 200),
+            help='Students claimed and written back together'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'BARCODE_WORKERS', None) or os.cpu_count(),
+            help='Rendering processes (0 renders in this process)'
+        )
+        parser.add_argument('--retry-failed', action='store_true', help='Queue failed barcodes again first')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            self.stdout.write(f'Queued {retry_failed()} failed barcodes again.')
+        counts = barcode_counts()
+        self.stdout.write(f"Barcode worker started: {counts['pending']} pending, {counts['failed']} failed.")
+
+        with render_pool(options['workers'], options['batch_size']) as map_func:
+            self.run(options, map_func)
+
+    def run(self, options, map_func):
+        while True:
+            ready, failed = process_pending_barcodes(options['batch_size'], map_func)
+            if not ready and not failed:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(self.style.SUCCESS(f'Generated {ready} barcodes.'))
+            if failed:
+                self.stdout.write(self.style.ERROR(f'{failed} barcodes failed; see barcode_error.'))
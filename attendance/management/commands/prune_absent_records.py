@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from attendance.models import Course, AttendanceSession, AttendanceRecord
+from attendance.reports import missing_students
+
+
+class Command(BaseCommand):
+    help = 'Delete untouched absent records so absences are derived from enrollment instead'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        sessions = AttendanceSession.objects.filter(roster_materialized=True).exclude(status='active')
+        pruned_sessions = 0
+        pruned_records = 0
+
+        for session in sessions.iterator():
+            # Only rows that would be derived again are safe to drop
+            enrolled = Course.students.through.objects.filter(
+                course_id=session.course_id, student_id=OuterRef('student_id')
+            )
+            untouched = AttendanceRecord.objects.filter(
+                session=session, status='absent', check_in_time__isnull=True, notes=''
+            ).filter(Exists(enrolled))
+
+            # Derived absences must match the stored ones exactly: skip the
+            # session if a student left the course with an absent record, or
+            # joined it after the session without getting one
+            stored_absent = AttendanceRecord.objects.filter(session=session, status='absent').count()
+            count = untouched.count()
+            if count != stored_absent or missing_students(session).exists():
+                continue
+
+            pruned_sessions += 1
+            pruned_records += count
+            if options['dry_run']:
+                continue
+
+            with transaction.atomic():
+                untouched.delete()
+                session.roster_materialized = False
+                session.save(update_fields=['roster_materialized', 'updated_at'])
+
+        action = 'Would prune' if options['dry_run'] else 'Pruned'
+        self.stdout.write(
+            self.style.SUCCESS(f'{action} {pruned_records} absent records from {pruned_sessions} sessions.')
+        )
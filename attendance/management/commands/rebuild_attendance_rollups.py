@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from attendance.models import Course
+from attendance.rollups import rebuild_course_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the course and student attendance rollups from the attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=str, help='Only this course code')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['course']:
+            courses = courses.filter(course_code=options['course'])
+
+        rebuilt = 0
+        for course in courses.iterator():
+            rebuild_course_rollups(course)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt attendance rollups for {rebuilt} courses.'))
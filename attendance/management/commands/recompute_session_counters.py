@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from attendance.models import AttendanceSession
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored enrolled/present/late/excused counters of attendance sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=str, help='Only sessions of this course code')
+        parser.add_argument('--active', action='store_true', help='Only active sessions')
+
+    def handle(self, *args, **options):
+        sessions = AttendanceSession.objects.all()
+        if options['course']:
+            sessions = sessions.filter(course__course_code=options['course'])
+        if options['active']:
+            sessions = sessions.filter(status='active')
+
+        updated = sessions.refresh_counters()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed counters for {updated} sessions.'))
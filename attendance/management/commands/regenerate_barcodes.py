@@ -0,0 +1,68 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from attendance.barcodes import barcode_counts, process_pending_barcodes, queue_barcodes, render_pool
+from attendance.models import Course, Student
+
+
+class Command(BaseCommand):
+    help = 'Render the barcode images of students again, in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', help='Only students enrolled in this course code')
+        parser.add_argument('--program', help='Only students in this program')
+        parser.add_argument('--level', help='Only students at this level')
+        parser.add_argument('--missing', action='store_true', help='Only students without a stored image')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Finish the barcodes still pending from an interrupted run without queueing any more'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=getattr(settings, 'BARCODE_BATCH_SIZE', 200),
+            help='Students claimed and written back together'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'BARCODE_WORKERS', None) or os.cpu_count(),
+            help='Rendering processes (0 renders in this process)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['resume']:
+            students = Student.objects.all()
+            if options['course']:
+                try:
+                    course = Course.objects.get(course_code=options['course'])
+                except Course.DoesNotExist:
+                    raise CommandError(f"Course {options['course']} does not exist.")
+                students = students.filter(courses=course)
+            if options['program']:
+                students = students.filter(program=options['program'])
+            if options['level']:
+                students = students.filter(level=options['level'])
+            if options['missing']:
+                students = students.filter(Q(barcode_image='') | Q(barcode_image__isnull=True))
+            self.stdout.write(f'Queued {queue_barcodes(students)} students.')
+
+        # Progress is stored on the rows, so an interrupted run is finished with --resume
+        total = barcode_counts()['pending']
+        done = failed = 0
+        started = time.monotonic()
+        with render_pool(options['workers'], options['batch_size']) as map_func:
+            while True:
+                batch_ready, batch_failed = process_pending_barcodes(options['batch_size'], map_func)
+                if not batch_ready and not batch_failed:
+                    break
+                done += batch_ready + batch_failed
+                failed += batch_failed
+                rate = done / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f'{done}/{total} barcodes ({failed} failed, {rate:.0f}/s)')
+
+        self.stdout.write(self.style.SUCCESS(f'Regenerated {done - failed} barcodes.'))
+        if failed:
+            self.stdout.write(self.style.ERROR(
+                f'{failed} barcodes failed; see barcode_error and run process_barcodes --retry-failed.'
+            ))
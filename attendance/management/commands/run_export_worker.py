@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from attendance.exports import run_export_job
+from attendance.id_cards import run_barcode_sheets_job
+from attendance.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Process queued attendance export and barcode sheet jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument(
+            '--interval', type=float, default=getattr(settings, 'EXPORT_WORKER_POLL_INTERVAL', 2),
+            help='Seconds to wait between checks of an empty queue'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Export worker started.')
+        while True:
+            job = ExportJob.claim_next()
+            if job is None:
+                self.purge_expired()
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(f'Exporting {job.filename} ({job.job_id})...')
+            if job.kind == 'barcode_sheets':
+                run_barcode_sheets_job(job)
+            else:
+                run_export_job(job)
+            if job.status == 'done':
+                unit = 'cards' if job.kind == 'barcode_sheets' else 'rows'
+                self.stdout.write(self.style.SUCCESS(f'Wrote {job.rows_written} {unit} to {job.file.name}.'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Export {job.job_id} failed: {job.error}'))
+
+    def purge_expired(self):
+        """Delete jobs and files older than EXPORT_JOB_RETENTION"""
+        retention = getattr(settings, 'EXPORT_JOB_RETENTION', 24 * 60 * 60)
+        expired = ExportJob.objects.filter(created_at__lt=timezone.now() - timezone.timedelta(seconds=retention))
+        for job in expired.exclude(status='running'):
+            if job.file:
+                job.file.delete(save=False)
+            job.delete()
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_record_session_updated_index'),
+    ]
+
+    operations = [
+        # Existing sessions keep their stored absent records
+        migrations.AddField(
+            model_name='attendancesession',
+            name='roster_materialized',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='attendancesession',
+            name='roster_materialized',
+            field=models.BooleanField(default=False),
+        ),
+    ]
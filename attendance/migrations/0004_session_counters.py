@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:48
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    AttendanceSession = apps.get_model('attendance', 'AttendanceSession')
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    Course = apps.get_model('attendance', 'Course')
+
+    def count(queryset, group_by):
+        rows = queryset.order_by().values(group_by).annotate(n=Count('pk')).values('n')
+        return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+    records = AttendanceRecord.objects.filter(session=OuterRef('pk'))
+    enrollment = Course.students.through.objects.filter(course_id=OuterRef('course_id'))
+    AttendanceSession.objects.update(
+        enrolled_count=count(enrollment, 'course_id'),
+        present_count=count(records.filter(status='present'), 'session'),
+        late_count=count(records.filter(status='late'), 'session'),
+        excused_count=count(records.filter(status='excused'), 'session'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_session_roster_materialized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancesession',
+            name='enrolled_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendancesession',
+            name='excused_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendancesession',
+            name='late_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendancesession',
+            name='present_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:55
+
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+STATUSES = ['present', 'late', 'absent', 'excused']
+
+
+def roll_up_ended_sessions(apps, schema_editor):
+    """Roll up the sessions that ended before rollups existed, as rebuild_course_rollups() does"""
+    Course = apps.get_model('attendance', 'Course')
+    AttendanceSession = apps.get_model('attendance', 'AttendanceSession')
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    CourseAttendanceSummary = apps.get_model('attendance', 'CourseAttendanceSummary')
+    StudentCourseAttendance = apps.get_model('attendance', 'StudentCourseAttendance')
+
+    ended = AttendanceSession.objects.filter(status='ended')
+    for course_id in ended.order_by().values_list('course_id', flat=True).distinct():
+        enrolled = set(Course.students.through.objects.filter(course_id=course_id).values_list('student_id', flat=True))
+        totals, rate_sum, per_student = Counter(), 0.0, defaultdict(Counter)
+        sessions = list(ended.filter(course_id=course_id))
+        for session in sessions:
+            statuses = dict(AttendanceRecord.objects.filter(session=session).values_list('student_id', 'status'))
+            if not session.roster_materialized:
+                statuses.update((pk, 'absent') for pk in enrolled - statuses.keys())
+            counts = Counter(statuses.values())
+            totals.update(counts)
+            for student_id, status in statuses.items():
+                per_student[student_id][status] += 1
+            if session.enrolled_count:
+                rate_sum += session.present_count / session.enrolled_count * 100
+            session.rolled_up = True
+            session.absent_count = counts['absent']
+        AttendanceSession.objects.bulk_update(sessions, ['rolled_up', 'absent_count'], batch_size=500)
+
+        CourseAttendanceSummary.objects.create(
+            course_id=course_id, sessions=len(sessions), rate_sum=rate_sum,
+            **{status: totals[status] for status in STATUSES}
+        )
+        StudentCourseAttendance.objects.bulk_create(
+            [
+                StudentCourseAttendance(
+                    student_id=student_id, course_id=course_id, sessions=sum(counts.values()),
+                    **{status: counts[status] for status in STATUSES}
+                )
+                for student_id, counts in per_student.items()
+            ],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_session_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancesession',
+            name='absent_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendancesession',
+            name='rolled_up',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='CourseAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('rate_sum', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summary', to='attendance.course')),
+            ],
+            options={
+                'verbose_name_plural': 'course attendance summaries',
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentCourseAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_attendance', to='attendance.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_attendance', to='attendance.student')),
+            ],
+            options={
+                'ordering': ['course', 'student'],
+                'unique_together': {('student', 'course')},
+            },
+        ),
+        migrations.RunPython(roll_up_ended_sessions, migrations.RunPython.noop),
+    ]
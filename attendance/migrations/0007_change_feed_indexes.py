@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_export_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['updated_at', 'id'], name='record_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['updated_at', 'id'], name='session_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['lecturer', 'updated_at', 'id'], name='session_lecturer_updated_idx'),
+        ),
+    ]
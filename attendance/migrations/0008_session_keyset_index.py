@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_change_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['lecturer', '-start_time', 'id'], name='session_lecturer_start_idx'),
+        ),
+    ]
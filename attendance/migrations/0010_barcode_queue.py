@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:21
+
+import attendance.models
+from django.db import migrations, models
+
+
+def mark_existing_ready(apps, schema_editor):
+    Student = apps.get_model('attendance', 'Student')
+    Student.objects.exclude(barcode_image='').exclude(barcode_image__isnull=True).update(barcode_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_roster_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='barcode_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='barcode_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='barcode_id',
+            field=models.CharField(blank=True, default=attendance.models.new_barcode_id, max_length=50, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['barcode_status', 'id'], name='student_barcode_status_idx'),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_barcode_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='kind',
+            field=models.CharField(choices=[('attendance', 'Attendance CSV'), ('barcode_sheets', 'Barcode sheets PDF')], default='attendance', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='level',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='program',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -1,16 +1,33 @@
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.utils.text import slugify
+import hashlib
+import json
 import uuid
-import qrcode
-from io import BytesIO
-from django.core.files import File
+from django.core.files.base import ContentFile
 from PIL import Image
 
+from .cache import invalidate_session_roster
+from .qr import render_qr
+
+
+def new_barcode_id():
+    return str(uuid.uuid4())
+
 
 class Student(models.Model):
+    BARCODE_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
     student_id = models.CharField(max_length=20, unique=True)
-    barcode_id = models.CharField(max_length=50, unique=True, blank=True)
+    barcode_id = models.CharField(max_length=50, unique=True, blank=True, default=new_barcode_id)
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
     email = models.EmailField()
@@ -18,46 +35,43 @@ class Student(models.Model):
     program = models.CharField(max_length=100)
     level = models.CharField(max_length=10)
     barcode_image = models.ImageField(upload_to='barcodes/', blank=True, null=True)
+    # Images are rendered off the request path by process_barcodes
+    barcode_status = models.CharField(max_length=10, choices=BARCODE_STATUS_CHOICES, default='pending')
+    barcode_error = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['student_id']
+        indexes = [
+            models.Index(fields=['barcode_status', 'id'], name='student_barcode_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student_id} - {self.first_name} {self.last_name}"
 
+    @staticmethod
+    def version_of(barcode_id):
+        return hashlib.sha256(barcode_id.encode()).hexdigest()[:12]
+
+    @property
+    def barcode_version(self):
+        """Short fingerprint of the barcode, for cache-busting image URLs"""
+        return self.version_of(self.barcode_id)
+
     def save(self, *args, **kwargs):
         if not self.barcode_id:
-            self.barcode_id = str(uuid.uuid4())
-        
-        # Only generate barcode if we don't have one
-        generate_barcode = not self.barcode_image
-        
+            self.barcode_id = new_barcode_id()
         super().save(*args, **kwargs)
-        
-        if generate_barcode:
-            self.generate_barcode()
-            super().save(update_fields=['barcode_image'])
 
     def generate_barcode(self):
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(self.barcode_id)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        buffer = BytesIO()
-        img.save(buffer, 'PNG')
-        filename = f'barcode_{self.student_id}.png'
-        filebuffer = File(buffer, name=filename)
-        self.barcode_image.save(filename, filebuffer)
+        """Render and store the barcode image now instead of queueing it"""
+        self.barcode_status = 'ready'
+        self.barcode_error = ''
+        if self.barcode_image:
+            self.barcode_image.delete(save=False)
+        self.barcode_image.save(f'barcode_{self.student_id}.png', ContentFile(render_qr(self.barcode_id)))
 
 
 class Lecturer(models.Model):
@@ -86,6 +100,8 @@ class Course(models.Model):
     semester = models.CharField(max_length=20)
     academic_year = models.CharField(max_length=10)
     is_active = models.BooleanField(default=True)
+    # Bumped on every enrollment change and every edit to an enrolled student
+    roster_version = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -97,6 +113,119 @@ class Course(models.Model):
         return f"{self.course_code} - {self.course_name}"
 
 
+class RosterChange(models.Model):
+    """
+    One student added to, removed from or changed in a course roster.
+
+    Each batch of changes bumps ``Course.roster_version`` and is logged at
+    the new version, so clients holding an older version can ask for just
+    the students that changed since.
+    """
+    ACTION_CHOICES = [
+        ('added', 'Added'),
+        ('removed', 'Removed'),
+        ('changed', 'Changed'),
+    ]
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='roster_changes')
+    # No constraint: removals must outlive deleted students
+    student = models.ForeignKey(Student, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    version = models.PositiveIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['course', 'version']
+        indexes = [
+            models.Index(fields=['course', 'version'], name='roster_change_version_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} v{self.version}: {self.action} {self.student_id}"
+
+    @classmethod
+    def record(cls, course_id, action, student_ids):
+        """Bump the roster version of a course and log the changed students at it"""
+        student_ids = set(student_ids)
+        if not student_ids:
+            return
+        with transaction.atomic():
+            # The UPDATE locks the course row until commit, so the version read back is ours
+            courses = Course.objects.filter(pk=course_id)
+            courses.update(roster_version=F('roster_version') + 1)
+            version = courses.values_list('roster_version', flat=True).get()
+            cls.objects.bulk_create(
+                [cls(course_id=course_id, student_id=pk, version=version, action=action) for pk in student_ids],
+                batch_size=500,
+            )
+
+    @classmethod
+    def record_student_changes(cls, student_ids, action='changed'):
+        """Log edited (or deleted, with ``action='removed'``) students in every course roster they are on"""
+        by_course = {}
+        enrollment = Course.students.through.objects.filter(student_id__in=list(student_ids))
+        for course_id, student_id in enrollment.values_list('course_id', 'student_id'):
+            by_course.setdefault(course_id, set()).add(student_id)
+        for course_id, ids in by_course.items():
+            cls.record(course_id, action, ids)
+
+    @classmethod
+    def since(cls, course, version):
+        """
+        The ``(added, changed, removed)`` student pks of a roster since ``version``.
+
+        Only the latest state counts: a student added then removed again is
+        only reported as removed.
+        """
+        touched = {}
+        for student_id, action in cls.objects.filter(course=course, version__gt=version).values_list('student_id', 'action'):
+            if action == 'added' or student_id not in touched:
+                touched[student_id] = action
+        enrolled = set(course.students.filter(pk__in=list(touched)).values_list('pk', flat=True))
+        added = {pk for pk, action in touched.items() if pk in enrolled and action == 'added'}
+        changed = enrolled - added
+        removed = touched.keys() - enrolled
+        return added, changed, removed
+
+
+class AttendanceSessionQuerySet(models.QuerySet):
+    def count_check_in(self, status, previous=None):
+        """
+        Add one ``status`` check-in to the counters, for the scan paths, and
+        take it off the ``previous`` status of a corrected check-in. The
+        change is atomic, so concurrent scans add up whatever order they
+        commit in.
+        """
+        counters = {f'{status}_count': F(f'{status}_count') + 1}
+        if previous:
+            counters[f'{previous}_count'] = F(f'{previous}_count') - 1
+        return self.update(updated_at=timezone.now(), **counters)
+
+    def refresh_counters(self, enrolled=True):
+        """
+        Recompute the stored attendance counters of every session from its
+        records in a single UPDATE.
+
+        For admin edits, batch imports and ``recompute_session_counters``: a
+        recount only sees committed records, so it can miss a check-in
+        committed while it runs and must not be used per scan.
+        """
+        def count(queryset, group_by):
+            rows = queryset.order_by().values(group_by).annotate(n=Count('pk')).values('n')
+            return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+        records = AttendanceRecord.objects.filter(session=OuterRef('pk'))
+        counters = {
+            'present_count': count(records.filter(status='present'), 'session'),
+            'late_count': count(records.filter(status='late'), 'session'),
+            'excused_count': count(records.filter(status='excused'), 'session'),
+        }
+        if enrolled:
+            enrollment = Course.students.through.objects.filter(course_id=OuterRef('course_id'))
+            counters['enrolled_count'] = count(enrollment, 'course_id')
+        return self.update(updated_at=timezone.now(), **counters)
+
+
 class AttendanceSession(models.Model):
     SESSION_STATUS = [
         ('active', 'Active'),
@@ -114,11 +243,31 @@ class AttendanceSession(models.Model):
     session_name = models.CharField(max_length=200, blank=True)
     location = models.CharField(max_length=200, blank=True)
     notes = models.TextField(blank=True)
+    # False when only real check-ins are stored and absences are derived on read
+    roster_materialized = models.BooleanField(default=False)
+    # Denormalized counters: scans add to them with AttendanceSession.objects.count_check_in(),
+    # everything else recounts them with refresh_counters()
+    enrolled_count = models.PositiveIntegerField(default=0)
+    present_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    excused_count = models.PositiveIntegerField(default=0)
+    # Set once the ended session has been added to the course rollups
+    rolled_up = models.BooleanField(default=False)
+    absent_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AttendanceSessionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            # Change feed pages are range scans over (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='session_updated_idx'),
+            models.Index(fields=['lecturer', 'updated_at', 'id'], name='session_lecturer_updated_idx'),
+            # Session lists page through (-start_time, id) by keyset
+            models.Index(fields=['lecturer', '-start_time', 'id'], name='session_lecturer_start_idx'),
+        ]
 
     def __str__(self):
         return f"{self.course.course_code} - {self.date} ({self.status})"
@@ -126,12 +275,31 @@ class AttendanceSession(models.Model):
     def save(self, *args, **kwargs):
         if not self.session_id:
             self.session_id = str(uuid.uuid4())
+        if self._state.adding:
+            self.enrolled_count = Course.students.through.objects.filter(course_id=self.course_id).count()
         super().save(*args, **kwargs)
 
+    def materialize_roster(self, batch_size=500):
+        """Create an absent record for every enrolled student using chunked bulk inserts"""
+        student_ids = Course.students.through.objects.filter(
+            course_id=self.course_id
+        ).values_list('student_id', flat=True)
+        AttendanceRecord.objects.bulk_create(
+            [AttendanceRecord(session=self, student_id=student_id, status='absent') for student_id in student_ids],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        self.roster_materialized = True
+        self.save(update_fields=['roster_materialized', 'updated_at'])
+
     def end_session(self):
         self.status = 'ended'
         self.end_time = timezone.now()
         self.save()
+        invalidate_session_roster(self.session_id)
+
+        from .rollups import roll_up_session
+        roll_up_session(self)
 
     @property
     def duration(self):
@@ -141,11 +309,11 @@ class AttendanceSession(models.Model):
 
     @property
     def total_students(self):
-        return self.course.students.count()
+        return self.enrolled_count
 
     @property
     def present_students(self):
-        return self.attendance_records.filter(status='present').count()
+        return self.present_count
 
     @property
     def absent_students(self):
@@ -157,6 +325,27 @@ class AttendanceSession(models.Model):
             return 0
         return (self.present_students / self.total_students) * 100
 
+    @property
+    def status_breakdown(self):
+        """
+        Present, late, absent and excused figures without reading records.
+
+        Absences are frozen by the rollup once the session has ended; before
+        that they are whatever the enrollment leaves after the live counters.
+        """
+        if self.rolled_up:
+            absent = self.absent_count
+        else:
+            absent = max(self.enrolled_count - self.present_count - self.late_count - self.excused_count, 0)
+        breakdown = {
+            'present': self.present_count,
+            'late': self.late_count,
+            'absent': absent,
+            'excused': self.excused_count,
+        }
+        breakdown['total'] = sum(breakdown.values())
+        return breakdown
+
 
 class AttendanceRecord(models.Model):
     ATTENDANCE_STATUS = [
@@ -175,13 +364,135 @@ class AttendanceRecord(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Check-ins later than this after the session start are marked late
+    GRACE_PERIOD = timezone.timedelta(minutes=15)
+
     class Meta:
         unique_together = ['session', 'student']
         ordering = ['-created_at']
+        indexes = [
+            # Live session updates poll records changed since a cursor
+            models.Index(fields=['session', 'updated_at', 'id'], name='record_session_updated_idx'),
+            # Change feed pages are range scans over (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='record_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.student_id} - {self.session.course.course_code} ({self.status})"
 
+    @classmethod
+    def status_for_check_in(cls, check_in_time, start_time):
+        """Return 'present' or 'late' for a check-in at the given time"""
+        if start_time and check_in_time > start_time + cls.GRACE_PERIOD:
+            return 'late'
+        return 'present'
+
+    @classmethod
+    def check_in_guard(cls, check_in_time):
+        """
+        Records a scan at ``check_in_time`` may check in: absent ones with no
+        check-in yet, or ones checked in later than it, so the earliest scan
+        wins. Excused records are never overwritten.
+        """
+        return ~Q(status='excused') & (
+            Q(status='absent', check_in_time__isnull=True) | Q(check_in_time__gt=check_in_time)
+        )
+
+    @classmethod
+    def upsert_check_in(cls, session_pk, student_pk, start_time, barcode_id='', check_in_time=None, materialized=False):
+        """
+        Check a student in unless they already are; returns ``(record, checked_in)``.
+
+        The database decides whether the scan counts, so concurrent or
+        repeated scans never overwrite a check-in. A first check-in costs two
+        queries: the record is written, by an INSERT that ignores an existing
+        record or, in sessions with ``materialized`` absences, by a
+        conditional UPDATE of the absent one, and the session counter is
+        incremented. After an INSERT the increment only matches the record
+        this scan created, so a scan that lost a race is not counted. A scan
+        that does not count gets back the stored status and time in
+        ``record``.
+
+        A scan earlier than the stored check-in, from a device whose clock
+        ran ahead or a scan committed out of order, replaces it and moves its
+        count to the new status.
+        """
+        check_in_time = check_in_time or timezone.now()
+        record = cls(
+            session_id=session_pk,
+            student_id=student_pk,
+            status=cls.status_for_check_in(check_in_time, start_time),
+            check_in_time=check_in_time,
+            scanned_barcode=barcode_id,
+        )
+        records = cls.objects.filter(session_id=session_pk, student_id=student_pk)
+        sessions = AttendanceSession.objects.filter(pk=session_pk)
+        fields = {'status': record.status, 'check_in_time': check_in_time, 'scanned_barcode': barcode_id}
+
+        def insert():
+            cls.objects.bulk_create([record], ignore_conflicts=True)
+            # Corrections never change created_at, so a corrected record is still counted here
+            created = records.filter(created_at=record.created_at)
+            return sessions.filter(Exists(created)).count_check_in(record.status)
+
+        def check_in_absent():
+            absent = records.filter(status='absent', check_in_time__isnull=True)
+            return absent.update(updated_at=timezone.now(), **fields) and sessions.count_check_in(record.status)
+
+        # No transaction around the write and its increment, to keep to two
+        # queries; recompute_session_counters repairs a counter if a process
+        # dies between them
+        for write in (check_in_absent, insert) if materialized else (insert, check_in_absent):
+            if write():
+                return record, True
+
+        status, stored_time = records.values_list('status', 'check_in_time').get()
+        if status != 'excused' and stored_time is not None and stored_time > check_in_time:
+            try:
+                with transaction.atomic():
+                    # Only while the record is as read, so a concurrent correction is not counted twice
+                    if records.filter(status=status, check_in_time=stored_time).update(updated_at=timezone.now(), **fields):
+                        if status != record.status:
+                            sessions.count_check_in(record.status, previous=status if status in ('present', 'late') else None)
+                        return record, True
+            except IntegrityError:
+                # The record's own increment has not landed yet, so its count cannot
+                # be moved; the scan is too close to the stored one to matter
+                pass
+            status, stored_time = records.values_list('status', 'check_in_time').get()
+        record.status, record.check_in_time = status, stored_time
+        return record, False
+
+    @classmethod
+    def bulk_upsert_check_ins(cls, records, batch_size=500):
+        """
+        Write check-in records under ``check_in_guard()``; returns how many were written.
+
+        Missing records are inserted as absent, then each chunk is checked in
+        by a single conditional UPDATE.
+        """
+        cls.objects.bulk_create(
+            [cls(session_id=record.session_id, student_id=record.student_id) for record in records],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        fields = ['status', 'check_in_time', 'scanned_barcode']
+        written = 0
+        for start in range(0, len(records), batch_size):
+            chunk = records[start:start + batch_size]
+            guard = Q()
+            cases = {field: [] for field in fields}
+            for record in chunk:
+                key = Q(session_id=record.session_id, student_id=record.student_id)
+                guard |= key & cls.check_in_guard(record.check_in_time)
+                for field in fields:
+                    cases[field].append(When(key, then=Value(getattr(record, field))))
+            written += cls.objects.filter(guard).update(
+                updated_at=timezone.now(),
+                **{field: Case(*cases[field], output_field=cls._meta.get_field(field)) for field in fields}
+            )
+        return written
+
     def mark_present(self, barcode_id=None):
         self.status = 'present'
         self.check_in_time = timezone.now()
@@ -191,6 +502,205 @@ class AttendanceRecord(models.Model):
 
     def is_late(self):
         if self.check_in_time and self.session.start_time:
-            grace_period = timezone.timedelta(minutes=15)  # 15 minutes grace period
-            return self.check_in_time > (self.session.start_time + grace_period)
-        return False
\ No newline at end of file
+            return self.check_in_time > (self.session.start_time + self.GRACE_PERIOD)
+        return False
+
+class CourseAttendanceSummary(models.Model):
+    """Attendance of a course, rolled up from its ended sessions"""
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, related_name='attendance_summary')
+    sessions = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    # Sum of the attendance rates of the sessions, for the course average
+    rate_sum = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'course attendance summaries'
+
+    def __str__(self):
+        return f"{self.course.course_code} ({self.sessions} sessions)"
+
+    @property
+    def average_attendance(self):
+        if self.sessions == 0:
+            return 0
+        return self.rate_sum / self.sessions
+
+
+class StudentCourseAttendance(models.Model):
+    """Attendance of a student in one course, rolled up from its ended sessions"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='course_attendance')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='student_attendance')
+    sessions = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['student', 'course']
+        ordering = ['course', 'student']
+
+    def __str__(self):
+        return f"{self.student.student_id} - {self.course.course_code}"
+
+    @property
+    def attendance_rate(self):
+        if self.sessions == 0:
+            return 0
+        return (self.present / self.sessions) * 100
+
+
+class ExportJob(models.Model):
+    """
+    An attendance export, or a run of barcode sheets, written to media
+    storage by the export worker.
+
+    Jobs are queued in the database and picked up by
+    ``manage.py run_export_worker``; identical exports requested within
+    ``EXPORT_JOB_TTL`` share one job and its file.
+    """
+    JOB_KINDS = [
+        ('attendance', 'Attendance CSV'),
+        ('barcode_sheets', 'Barcode sheets PDF'),
+    ]
+
+    JOB_STATUS = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    job_id = models.CharField(max_length=50, unique=True, blank=True)
+    kind = models.CharField(max_length=20, choices=JOB_KINDS, default='attendance')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True, related_name='export_jobs')
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    compress = models.BooleanField(default=False)
+    program = models.CharField(max_length=100, blank=True)
+    level = models.CharField(max_length=10, blank=True)
+    params_hash = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=10, choices=JOB_STATUS, default='pending')
+    total_rows = models.PositiveIntegerField(default=0)
+    rows_written = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='export_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+    def save(self, *args, **kwargs):
+        if not self.job_id:
+            self.job_id = str(uuid.uuid4())
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def hash_params(course_id, start_date, end_date, compress, kind='attendance', program='', level=''):
+        params = [course_id, str(start_date or ''), str(end_date or ''), bool(compress)]
+        if kind != 'attendance':
+            params += [kind, program or '', level or '']
+        return hashlib.sha256(json.dumps(params).encode()).hexdigest()
+
+    @classmethod
+    def request_export(cls, user, course=None, start_date=None, end_date=None, compress=False,
+                       kind='attendance', program='', level=''):
+        """Return a recent job for the same export, or queue a new one"""
+        program, level = program or '', level or ''
+        params_hash = cls.hash_params(course.pk if course else None, start_date, end_date, compress, kind, program, level)
+        recent = timezone.now() - timezone.timedelta(seconds=getattr(settings, 'EXPORT_JOB_TTL', 15 * 60))
+        job = cls.objects.filter(
+            params_hash=params_hash, status__in=['pending', 'running', 'done'], created_at__gte=recent
+        ).first()
+        if job is None:
+            job = cls.objects.create(
+                requested_by=user, kind=kind, course=course, start_date=start_date, end_date=end_date,
+                compress=compress, program=program, level=level, params_hash=params_hash
+            )
+        return job
+
+    @classmethod
+    def claim_next(cls):
+        """
+        Mark the oldest queued job as running and return it.
+
+        Running jobs that stopped reporting progress are picked up again, so
+        a crashed worker does not leave them stuck.
+        """
+        stale = timezone.now() - timezone.timedelta(seconds=getattr(settings, 'EXPORT_JOB_STALE_AFTER', 10 * 60))
+        with transaction.atomic():
+            job = cls.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending') | Q(status='running', updated_at__lt=stale)
+            ).order_by('created_at').first()
+            if job is None:
+                return None
+            job.status = 'running'
+            job.started_at = timezone.now()
+            job.rows_written = 0
+            job.save(update_fields=['status', 'started_at', 'rows_written', 'updated_at'])
+        return job
+
+    @classmethod
+    def unclaimed(cls):
+        """Jobs queued for longer than ``EXPORT_JOB_UNCLAIMED_AFTER``, which no worker has picked up"""
+        waiting = timezone.now() - timezone.timedelta(seconds=getattr(settings, 'EXPORT_JOB_UNCLAIMED_AFTER', 60))
+        return cls.objects.filter(status='pending', created_at__lt=waiting)
+
+    @property
+    def is_unclaimed(self):
+        waiting = timezone.now() - timezone.timedelta(seconds=getattr(settings, 'EXPORT_JOB_UNCLAIMED_AFTER', 60))
+        return self.status == 'pending' and self.created_at < waiting
+
+    def sessions(self):
+        sessions = AttendanceSession.objects.all()
+        if self.course_id:
+            sessions = sessions.filter(course_id=self.course_id)
+        if self.start_date:
+            sessions = sessions.filter(date__gte=self.start_date)
+        if self.end_date:
+            sessions = sessions.filter(date__lte=self.end_date)
+        return sessions
+
+    def can_access(self, user):
+        if user.is_superuser:
+            return True
+        return self.course is not None and self.course.lecturer.user_id == user.pk
+
+    @property
+    def filename(self):
+        if self.kind == 'barcode_sheets':
+            parts = [self.course.course_code if self.course else '', self.program, self.level]
+            return '_'.join(['barcode_sheets'] + [slugify(part) for part in parts if part]) + '.pdf'
+        name = f"attendance_{self.course.course_code}" if self.course else "attendance_all_courses"
+        if self.start_date or self.end_date:
+            name += f"_{self.start_date or ''}_{self.end_date or ''}"
+        return name + ('.csv.gz' if self.compress else '.csv')
+
+    @property
+    def content_type(self):
+        if self.kind == 'barcode_sheets':
+            return 'application/pdf'
+        return 'application/gzip' if self.compress else 'text/csv'
+
+    @property
+    def progress(self):
+        if self.status == 'done':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(int(self.rows_written * 100 / self.total_rows), 99)
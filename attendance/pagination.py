@@ -0,0 +1,189 @@
+"""
+Keyset pagination.
+
+Pages are fetched with a ``WHERE`` on the position of the last row seen
+instead of an ``OFFSET``, so deep pages cost the same as the first one.
+Cursors are opaque to clients: a URL-safe base64 encoding of that position.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode(payload):
+    data = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def _decode(token):
+    try:
+        return json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor.')
+
+
+def encode_cursor(updated_at, pk):
+    return _encode([updated_at.isoformat(), pk])
+
+
+def decode_cursor(token):
+    """Return the ``(updated_at, pk)`` position of a cursor, or raise ValueError"""
+    try:
+        value, pk = _decode(token)
+        updated_at = parse_datetime(value)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor.')
+    if updated_at is None or not isinstance(pk, int):
+        raise ValueError('Invalid cursor.')
+    return updated_at, pk
+
+
+def keyset_filter(queryset, ordering, position):
+    """
+    Rows after ``position`` (one value per ``ordering`` field) in that order.
+
+    The redundant bound on the first field lets the database use it as the
+    start of an index range scan.
+    """
+    first = ordering[0].lstrip('-')
+    bound = 'lte' if ordering[0].startswith('-') else 'gte'
+    after = Q()
+    equal = {}
+    for name, value in zip(ordering, position):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        after |= Q(**equal, **{f'{field}__{lookup}': value})
+        equal[field] = value
+    return queryset.filter(**{f'{first}__{bound}': position[0]}).filter(after)
+
+
+def after_position(queryset, updated_at, pk):
+    """Rows after ``(updated_at, pk)`` in keyset order"""
+    return keyset_filter(queryset, ['updated_at', 'pk'], [updated_at, pk])
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated queryset.
+
+    ``ordering`` must end with a unique field so every row has a distinct
+    position. A cursor holds a direction and the position of the row the
+    page starts after; walking backwards reads the reversed ordering.
+    """
+    LAST = _encode([True, None])
+
+    def __init__(self, queryset, ordering, cursor=None, per_page=20):
+        try:
+            backwards, position = _decode(cursor) if cursor else (False, None)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor.')
+        if not isinstance(backwards, bool) or not (position is None or isinstance(position, list) and len(position) == len(ordering)):
+            raise ValueError('Invalid cursor.')
+
+        if backwards:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        # Related fields are read back through annotations
+        self.keys = [name.lstrip('-') for name in ordering]
+        annotations = {f'keyset_{i}': F(key) for i, key in enumerate(self.keys) if '__' in key}
+        queryset = queryset.annotate(**annotations).order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = keyset_filter(queryset, ordering, position)
+            except (TypeError, ValueError, ValidationError):
+                raise ValueError('Invalid cursor.')
+
+        rows = list(queryset[:per_page + 1])
+        more = len(rows) > per_page
+        self.object_list = rows[:per_page]
+        if backwards:
+            self.object_list.reverse()
+        self.has_next = position is not None if backwards else more
+        self.has_previous = more if backwards else position is not None
+
+    def _position(self, row):
+        values = [getattr(row, f'keyset_{i}' if '__' in key else key) for i, key in enumerate(self.keys)]
+        # Full isoformat: the position must match the stored value exactly
+        return [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return _encode([False, self._position(self.object_list[-1])])
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return _encode([True, self._position(self.object_list[0])])
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def keyset_page(queryset, ordering, cursor, per_page):
+    """Like ``Paginator.get_page()``, an invalid cursor shows the first page"""
+    try:
+        return KeysetPage(queryset, ordering, cursor, per_page)
+    except ValueError:
+        return KeysetPage(queryset, ordering, None, per_page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    API pagination over the view's ``keyset_ordering``.
+
+    Responses carry ``next`` and ``previous`` links instead of a total
+    count; an unknown cursor is a 404, as with DRF's ``CursorPagination``.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = ['pk']
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        ordering = getattr(view, 'keyset_ordering', self.ordering)
+        try:
+            self.page = KeysetPage(queryset, ordering, request.query_params.get(self.cursor_query_param), self.page_size)
+        except ValueError:
+            raise NotFound('Invalid cursor.')
+        return self.page.object_list
+
+    def _link(self, cursor):
+        if cursor:
+            return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.page.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.page.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,192 @@
+"""
+QR code rendering with a two-tier render cache.
+
+QR codes are encoded with a fixed mask pattern, skipping qrcode's search
+of all eight, and rendered straight from their module matrix: PNGs are
+written directly as 1-bit greyscale, each packed row built once and
+repeated, and SVGs as one path of module runs, instead of drawing every
+module box through PIL.
+
+Renders are keyed by ``(barcode_id, size, format)`` and never change for a
+given key, so they are kept in an in-process LRU cache backed by
+content-addressed files on disk, and served with strong ETags.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+
+import qrcode
+from django.conf import settings
+from django.utils.http import quote_etag
+
+from .cache import LRUCache
+
+
+# Bump when the rendering changes so cached renders and ETags are replaced
+RENDER_VERSION = 3
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+DEFAULT_SIZE = 10  # pixels per module
+MAX_SIZE = 40
+
+# Any mask is valid, as the chosen one is recorded in the code's format
+# information; 2 is the one qrcode's penalty search picks for most UUIDs
+MASK_PATTERN = 2
+
+render_cache = LRUCache(maxsize=getattr(settings, 'QR_RENDER_CACHE_SIZE', 4096))
+
+
+def make_qr(barcode_id, size=DEFAULT_SIZE):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=size,
+        border=4,
+        mask_pattern=MASK_PATTERN,
+    )
+    qr.add_data(barcode_id)
+    qr.make(fit=True)
+    return qr
+
+
+def qr_matrix(barcode_id):
+    """Rows of dark (True) and light modules, quiet zone included"""
+    return make_qr(barcode_id).get_matrix()
+
+
+def _png_chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+
+def render_png(matrix, size=DEFAULT_SIZE):
+    """1-bit greyscale PNG with ``size`` pixels per module"""
+    width = len(matrix) * size
+    dark, light = '0' * size, '1' * size
+    padding = '0' * (-width % 8)
+    lines = []
+    for row in matrix:
+        bits = ''.join(dark if module else light for module in row) + padding
+        # Filter type 0, then the packed pixels; every module row is ``size`` pixel rows
+        lines.append((b'\x00' + int(bits, 2).to_bytes(len(bits) // 8, 'big')) * size)
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, width, 1, 0, 0, 0, 0)),
+        _png_chunk(b'IDAT', zlib.compress(b''.join(lines))),
+        _png_chunk(b'IEND', b''),
+    ])
+
+
+def module_runs(matrix):
+    """``(x, y, length)`` of every horizontal run of dark modules, top row first"""
+    n = len(matrix)
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < n:
+            if row[x]:
+                start = x
+                while x < n and row[x]:
+                    x += 1
+                yield start, y, x - start
+            else:
+                x += 1
+
+
+def render_svg(matrix, size=DEFAULT_SIZE):
+    """SVG drawn in module units, one subpath per horizontal run of dark modules"""
+    n = len(matrix)
+    runs = [f'M{x} {y}h{length}v1h-{length}z' for x, y, length in module_runs(matrix)]
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{n * size}" height="{n * size}" '
+        f'viewBox="0 0 {n} {n}" shape-rendering="crispEdges">'
+        f'<rect width="{n}" height="{n}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(runs)}"/></svg>'
+    ).encode()
+
+
+RENDERERS = {
+    'png': render_png,
+    'svg': render_svg,
+}
+
+
+def render_qr(barcode_id, size=DEFAULT_SIZE, fmt='png'):
+    """Render a QR code, uncached"""
+    return RENDERERS[fmt](qr_matrix(barcode_id), size)
+
+
+def try_render_qr(barcode_id, size=DEFAULT_SIZE, fmt='png'):
+    """
+    ``(data, None)``, or ``(None, error)`` if rendering failed.
+
+    For ``Executor.map()``, where one exception would abandon the whole batch.
+    """
+    try:
+        return render_qr(barcode_id, size, fmt), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+def render_key(barcode_id, size, fmt):
+    return hashlib.sha256(f'{RENDER_VERSION}:{fmt}:{size}:{barcode_id}'.encode()).hexdigest()
+
+
+def render_etag(barcode_id, size, fmt):
+    """Strong ETag of a render, computed without rendering it"""
+    return quote_etag(render_key(barcode_id, size, fmt)[:32])
+
+
+def _disk_path(key, fmt):
+    root = getattr(settings, 'QR_RENDER_CACHE_DIR', None)
+    if root:
+        return os.path.join(root, key[:2], f'{key}.{fmt}')
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        os.remove(tmp)
+        raise
+
+
+def get_qr_image(barcode_id, size=DEFAULT_SIZE, fmt='png'):
+    """
+    The rendered QR code of a barcode, from memory, then disk, then PIL.
+
+    Disk files are named after the render key and written atomically, so
+    workers can share the directory and it can be emptied at any time.
+    """
+    key = render_key(barcode_id, size, fmt)
+    data = render_cache.get(key)
+    if data is not None:
+        return data
+
+    path = _disk_path(key, fmt)
+    if path:
+        try:
+            with open(path, 'rb') as cached:
+                data = cached.read()
+        except OSError:
+            pass
+    if data is None:
+        data = render_qr(barcode_id, size, fmt)
+        if path:
+            try:
+                _write_atomic(path, data)
+            except OSError:
+                # The disk tier is best effort
+                pass
+
+    render_cache.set(key, data)
+    return data
@@ -0,0 +1,142 @@
+"""
+Attendance figures derived from stored records.
+
+Sessions that do not materialize their roster only store real check-ins,
+late marks and excused marks; every enrolled student without a record is
+counted as absent when the session is read.
+"""
+from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Student, Course, AttendanceRecord
+
+
+def count_subquery(queryset, group_by):
+    """
+    Correlated COUNT of ``queryset`` rows grouped by ``group_by``.
+
+    Unlike ``Count()`` over a to-many join, several of these can be
+    annotated on one queryset without multiplying its rows.
+    """
+    rows = queryset.order_by().values(group_by).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def missing_students(session):
+    """Enrolled students of the session that have no stored record"""
+    has_record = AttendanceRecord.objects.filter(session=session, student=OuterRef('pk'))
+    return session.course.students.exclude(Exists(has_record))
+
+
+def session_records(session):
+    """
+    Every record of a session, including derived absences.
+
+    Students without a stored record get an unsaved ``absent`` record so
+    callers can treat both storage modes the same way.
+    """
+    records = list(AttendanceRecord.objects.filter(session=session).select_related('student'))
+    if not session.roster_materialized:
+        records += [
+            AttendanceRecord(session=session, student=student, status='absent')
+            for student in missing_students(session)
+        ]
+    return records
+
+
+def with_status_counts(sessions):
+    """
+    Annotate sessions with ``n_total``, ``n_present``, ``n_late``,
+    ``n_absent`` and ``n_excused`` in one grouped query.
+
+    Record statuses are counted with conditional aggregates; the absences of
+    sessions that do not store them are counted by a correlated subquery
+    over the enrollment table in the same statement.
+    """
+    def status_count(status):
+        return Count('attendance_records', filter=Q(attendance_records__status=status))
+
+    has_record = AttendanceRecord.objects.filter(session=OuterRef(OuterRef('pk')), student=OuterRef('student_id'))
+    missing = Course.students.through.objects.filter(
+        course_id=OuterRef('course_id')
+    ).exclude(Exists(has_record)).order_by().values('course_id').annotate(n=Count('pk')).values('n')
+    derived_absent = Case(
+        When(roster_materialized=False, then=Coalesce(Subquery(missing, output_field=IntegerField()), 0)),
+        default=Value(0),
+    )
+
+    return sessions.annotate(
+        n_present=status_count('present'),
+        n_late=status_count('late'),
+        n_excused=status_count('excused'),
+        n_absent=status_count('absent') + derived_absent,
+        n_total=Count('attendance_records') + derived_absent,
+    )
+
+
+
+class AttendanceMatrix:
+    """
+    Students x sessions grid of status codes for one course.
+
+    The grid is a flat ``bytearray`` stored session by session, so a
+    session is a contiguous slice and a student is a strided slice; counts
+    and letters come from C-level ``bytes`` operations rather than Python
+    loops over cells.
+    """
+    NONE, PRESENT, LATE, ABSENT, EXCUSED = range(5)
+    CODES = {'present': PRESENT, 'late': LATE, 'absent': ABSENT, 'excused': EXCUSED}
+    # Code -> letter translation table for compact rows
+    LETTERS = bytes.maketrans(bytes(range(5)), b'-PLAE')
+
+    def __init__(self, course, sessions):
+        self.course = course
+        self.sessions = list(sessions.order_by('date', 'start_time').values_list(
+            'pk', 'session_id', 'date', 'session_name', 'roster_materialized'
+        ))
+        self.students = list(course.students.order_by('student_id').values_list(
+            'pk', 'student_id', 'first_name', 'last_name'
+        ))
+        enrolled = len(self.students)
+        session_index = {pk: j for j, (pk, *_) in enumerate(self.sessions)}
+
+        records = list(AttendanceRecord.objects.filter(
+            session__in=[session[0] for session in self.sessions]
+        ).order_by().values_list('student_id', 'session_id', 'status'))
+
+        # Students with records who have since left the course get a row too
+        student_index = {pk: i for i, (pk, *_) in enumerate(self.students)}
+        former = {student_pk for student_pk, _, _ in records} - student_index.keys()
+        if former:
+            self.students += Student.objects.filter(pk__in=former).order_by('student_id').values_list(
+                'pk', 'student_id', 'first_name', 'last_name'
+            )
+            student_index = {pk: i for i, (pk, *_) in enumerate(self.students)}
+
+        n = self.n_students = len(self.students)
+        self.grid = bytearray(n * len(self.sessions))
+        # Sessions that do not store absences start with every enrolled student absent
+        derived = bytes([self.ABSENT]) * enrolled + bytes(n - enrolled)
+        for j, session in enumerate(self.sessions):
+            if not session[4]:
+                self.grid[j * n:(j + 1) * n] = derived
+        for student_pk, session_pk, status in records:
+            self.grid[session_index[session_pk] * n + student_index[student_pk]] = self.CODES[status]
+
+    def session_cells(self, j):
+        return self.grid[j * self.n_students:(j + 1) * self.n_students]
+
+    def student_cells(self, i):
+        return self.grid[i::self.n_students]
+
+    @classmethod
+    def summarize(cls, cells):
+        """Status counts and attendance rate (present / recorded) of a run of cells"""
+        counts = {status: cells.count(code) for status, code in cls.CODES.items()}
+        total = len(cells) - cells.count(cls.NONE)
+        counts['attendance_rate'] = round(counts['present'] * 100 / total, 2) if total else 0
+        return counts
+
+    def student_row(self, i):
+        """Compact status letters of a student across sessions, e.g. ``'PPLA-E'``"""
+        return self.student_cells(i).translate(self.LETTERS).decode('ascii')
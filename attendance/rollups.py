@@ -0,0 +1,123 @@
+"""
+Attendance rollups.
+
+Ended sessions are added once to a per-course summary and to a
+per-student-per-course summary, and their absences are frozen on the
+session, so reports and dashboards read a handful of rows per course instead
+of every attendance record.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Exists, ExpressionWrapper, F, FloatField, OuterRef, Q, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from .models import Course, AttendanceSession, AttendanceRecord, CourseAttendanceSummary, StudentCourseAttendance
+from .reports import missing_students, with_status_counts
+
+
+STATUSES = ['present', 'late', 'absent', 'excused']
+
+
+def with_average_attendance(courses):
+    """Annotate courses with ``avg_attendance`` read from their summary"""
+    average = ExpressionWrapper(
+        F('attendance_summary__rate_sum') / NullIf(F('attendance_summary__sessions'), 0),
+        output_field=FloatField(),
+    )
+    return courses.annotate(avg_attendance=Coalesce(average, Value(0.0)))
+
+
+def roll_up_session(session):
+    """Add an ended session to the rollups of its course, once"""
+    with transaction.atomic():
+        claimed = AttendanceSession.objects.filter(pk=session.pk, status='ended', rolled_up=False).update(rolled_up=True)
+        if not claimed:
+            return
+
+        sessions = AttendanceSession.objects.filter(pk=session.pk)
+        sessions.refresh_counters(enrolled=False)
+        session.refresh_from_db(fields=['present_count', 'late_count', 'excused_count', 'enrolled_count'])
+
+        statuses = dict(AttendanceRecord.objects.filter(session=session).values_list('student_id', 'status'))
+        absent = Q(student_id__in=AttendanceRecord.objects.filter(session=session, status='absent').values('student_id'))
+        if not session.roster_materialized:
+            derived = missing_students(session).values_list('pk', flat=True)
+            statuses.update((pk, 'absent') for pk in derived)
+            absent |= Q(student_id__in=derived)
+        counts = Counter(statuses.values())
+
+        session.rolled_up = True
+        session.absent_count = counts['absent']
+        sessions.update(absent_count=session.absent_count)
+
+        CourseAttendanceSummary.objects.get_or_create(course_id=session.course_id)
+        CourseAttendanceSummary.objects.filter(course_id=session.course_id).update(
+            sessions=F('sessions') + 1,
+            rate_sum=F('rate_sum') + session.attendance_rate,
+            **{status: F(status) + counts[status] for status in STATUSES}
+        )
+
+        StudentCourseAttendance.objects.bulk_create(
+            [StudentCourseAttendance(student_id=pk, course_id=session.course_id) for pk in statuses],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+        rows = StudentCourseAttendance.objects.filter(course_id=session.course_id)
+        for status in STATUSES:
+            if not counts[status]:
+                continue
+            if status == 'absent':
+                students = absent
+            else:
+                students = Q(student_id__in=AttendanceRecord.objects.filter(session=session, status=status).values('student_id'))
+            rows.filter(students).update(sessions=F('sessions') + 1, **{status: F(status) + 1})
+
+
+def rebuild_course_rollups(course):
+    """Recompute the rollups of a course from all of its ended sessions"""
+    with transaction.atomic():
+        AttendanceSession.objects.filter(course=course).exclude(status='ended').update(rolled_up=False, absent_count=0)
+
+        ended = AttendanceSession.objects.filter(course=course, status='ended')
+        ended.refresh_counters(enrolled=False)
+        sessions = list(with_status_counts(ended))
+        for session in sessions:
+            session.rolled_up = True
+            session.absent_count = session.n_absent
+        AttendanceSession.objects.bulk_update(sessions, ['rolled_up', 'absent_count'], batch_size=500)
+
+        CourseAttendanceSummary.objects.update_or_create(course=course, defaults={
+            'sessions': len(sessions),
+            'present': sum(session.n_present for session in sessions),
+            'late': sum(session.n_late for session in sessions),
+            'absent': sum(session.n_absent for session in sessions),
+            'excused': sum(session.n_excused for session in sessions),
+            'rate_sum': sum(session.attendance_rate for session in sessions),
+        })
+
+        per_student = defaultdict(Counter)
+        stored = AttendanceRecord.objects.filter(session__in=ended).values_list('student_id', 'status').annotate(n=Count('pk'))
+        for student_id, status, n in stored.order_by():
+            per_student[student_id][status] += n
+
+        has_record = AttendanceRecord.objects.filter(
+            session=OuterRef('course__attendance_sessions'), student=OuterRef('student_id')
+        )
+        derived = Course.students.through.objects.filter(
+            course_id=course.pk, course__attendance_sessions__in=ended.filter(roster_materialized=False)
+        ).exclude(Exists(has_record)).values_list('student_id').annotate(n=Count('pk'))
+        for student_id, n in derived.order_by():
+            per_student[student_id]['absent'] += n
+
+        StudentCourseAttendance.objects.filter(course=course).delete()
+        StudentCourseAttendance.objects.bulk_create(
+            [
+                StudentCourseAttendance(
+                    student_id=student_id, course=course, sessions=sum(counts.values()),
+                    **{status: counts[status] for status in STATUSES}
+                )
+                for student_id, counts in per_student.items()
+            ],
+            batch_size=500,
+        )
@@ -1,10 +1,63 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from .models import Student, Lecturer, Course, AttendanceSession, AttendanceRecord
-
+from django.conf import settings
+from django.utils import timezone
+from django.db.models import Exists, OuterRef, Prefetch, Subquery
+import copy
 
-class UserSerializer(serializers.ModelSerializer):
+from .models import Student, Lecturer, Course, AttendanceSession, AttendanceRecord
+from .cache import get_session_roster, invalidate_session_roster
+from .pagination import decode_cursor
+from .reports import count_subquery
+
+
+def parse_expand(value):
+    """Turn ``session,session.course`` into ``{'session': {'course': {}}}``"""
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for name in filter(None, path.strip().split('.')):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def requested_fields(request):
+    """The ``?fields=`` set (None for all fields) and ``?expand=`` tree of a request"""
+    params = getattr(request, 'query_params', {})
+    fields = {name.strip() for name in params.get('fields', '').split(',') if name.strip()}
+    return fields or None, parse_expand(params.get('expand'))
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and expansion for API serializers.
+
+    ``?fields=id,status`` keeps only the named top-level fields. Relations
+    listed in ``expandable_fields`` are serialized as ids unless named in
+    ``?expand=``, which takes dotted paths (``expand=session.course``) for
+    nested serializers.
+    """
+    # name -> (serializer class, extra kwargs)
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+        if expand is None:
+            # Top-level serializer: the options come from the request
+            fields, expand = requested_fields(self.context.get('request'))
+
+        for name, (serializer_class, options) in self.expandable_fields.items():
+            if name in expand and name in self.fields:
+                self.fields[name] = serializer_class(read_only=True, expand=expand[name], **options)
+        if fields:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
@@ -33,7 +86,7 @@ class LoginSerializer(serializers.Serializer):
         return data
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     barcode_image_url = serializers.SerializerMethodField()
 
     class Meta:
@@ -41,9 +94,9 @@ class StudentSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'student_id', 'barcode_id', 'first_name', 'last_name',
             'email', 'phone_number', 'program', 'level', 'barcode_image_url',
-            'is_active', 'created_at'
+            'barcode_status', 'is_active', 'created_at'
         ]
-        read_only_fields = ['barcode_id', 'barcode_image_url', 'created_at']
+        read_only_fields = ['barcode_id', 'barcode_image_url', 'barcode_status', 'created_at']
 
     def get_barcode_image_url(self, obj):
         if obj.barcode_image:
@@ -53,10 +106,12 @@ class StudentSerializer(serializers.ModelSerializer):
         return None
 
 
-class LecturerSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+class LecturerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
     full_name = serializers.SerializerMethodField()
 
+    expandable_fields = {'user': (UserSerializer, {})}
+
     class Meta:
         model = Lecturer
         fields = [
@@ -67,11 +122,18 @@ class LecturerSerializer(serializers.ModelSerializer):
     def get_full_name(self, obj):
         return f"{obj.user.first_name} {obj.user.last_name}"
 
+    @staticmethod
+    def related_paths(prefix=''):
+        """select_related() paths a lecturer needs: its user, for full_name"""
+        return [f'{prefix}user']
 
-class CourseSerializer(serializers.ModelSerializer):
-    lecturer = LecturerSerializer(read_only=True)
+
+class CourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    lecturer = serializers.PrimaryKeyRelatedField(read_only=True)
     students_count = serializers.SerializerMethodField()
 
+    expandable_fields = {'lecturer': (LecturerSerializer, {})}
+
     class Meta:
         model = Course
         fields = [
@@ -80,30 +142,63 @@ class CourseSerializer(serializers.ModelSerializer):
             'is_active', 'created_at'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None, expand=None):
+        """Join only the expanded lecturer and count students in the same query"""
+        expand = expand or {}
+        if 'lecturer' in expand:
+            queryset = queryset.select_related(*LecturerSerializer.related_paths('lecturer__'))
+        if not fields or 'students_count' in fields:
+            enrollment = Course.students.through.objects.filter(course_id=OuterRef('pk'))
+            queryset = queryset.annotate(students_count=count_subquery(enrollment, 'course_id'))
+        return queryset
+
     def get_students_count(self, obj):
+        # Querysets from setup_eager_loading() carry the count already
+        if hasattr(obj, 'students_count'):
+            return obj.students_count
         return obj.students.count()
 
 
-class CourseDetailSerializer(serializers.ModelSerializer):
-    lecturer = LecturerSerializer(read_only=True)
-    students = StudentSerializer(many=True, read_only=True)
+class CourseDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    lecturer = serializers.PrimaryKeyRelatedField(read_only=True)
+    students = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    expandable_fields = {
+        'lecturer': (LecturerSerializer, {}),
+        'students': (StudentSerializer, {'many': True}),
+    }
 
     class Meta:
         model = Course
         fields = [
             'id', 'course_code', 'course_name', 'description', 'lecturer',
-            'students', 'credit_hours', 'semester', 'academic_year',
+            'students', 'roster_version', 'credit_hours', 'semester', 'academic_year',
             'is_active', 'created_at'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None, expand=None):
+        expand = expand or {}
+        if 'lecturer' in expand:
+            queryset = queryset.select_related(*LecturerSerializer.related_paths('lecturer__'))
+        if not fields or 'students' in fields:
+            queryset = queryset.prefetch_related('students')
+        return queryset
 
-class AttendanceSessionSerializer(serializers.ModelSerializer):
-    course = CourseSerializer(read_only=True)
-    lecturer = LecturerSerializer(read_only=True)
+
+class AttendanceSessionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    course = serializers.PrimaryKeyRelatedField(read_only=True)
+    lecturer = serializers.PrimaryKeyRelatedField(read_only=True)
     duration = serializers.SerializerMethodField()
     attendance_summary = serializers.SerializerMethodField()
     date = serializers.SerializerMethodField()
 
+    expandable_fields = {
+        'course': (CourseSerializer, {}),
+        'lecturer': (LecturerSerializer, {}),
+    }
+
     class Meta:
         model = AttendanceSession
         fields = [
@@ -113,6 +208,22 @@ class AttendanceSessionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['session_id']
 
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None, expand=None):
+        """
+        Join only the expanded lecturer and course.
+
+        The attendance summary reads the stored session counters, so a page
+        of sessions costs one query, plus one for expanded courses.
+        """
+        expand = expand or {}
+        if 'lecturer' in expand:
+            queryset = queryset.select_related(*LecturerSerializer.related_paths('lecturer__'))
+        if 'course' in expand:
+            courses = CourseSerializer.setup_eager_loading(Course.objects.all(), expand=expand['course'])
+            queryset = queryset.prefetch_related(Prefetch('course', queryset=courses))
+        return queryset
+
     def get_duration(self, obj):
         duration = obj.duration
         if duration:
@@ -146,11 +257,16 @@ class AttendanceSessionCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class AttendanceRecordSerializer(serializers.ModelSerializer):
-    student = StudentSerializer(read_only=True)
-    session = AttendanceSessionSerializer(read_only=True)
+class AttendanceRecordSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    student = serializers.PrimaryKeyRelatedField(read_only=True)
+    session = serializers.PrimaryKeyRelatedField(read_only=True)
     is_late = serializers.SerializerMethodField()
 
+    expandable_fields = {
+        'student': (StudentSerializer, {}),
+        'session': (AttendanceSessionSerializer, {}),
+    }
+
     class Meta:
         model = AttendanceRecord
         fields = [
@@ -158,11 +274,33 @@ class AttendanceRecordSerializer(serializers.ModelSerializer):
             'scanned_barcode', 'notes', 'is_late', 'created_at'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None, expand=None):
+        expand = expand or {}
+        if 'student' in expand:
+            queryset = queryset.select_related('student')
+        if 'session' in expand:
+            sessions = AttendanceSessionSerializer.setup_eager_loading(
+                AttendanceSession.objects.all(), expand=expand['session']
+            )
+            queryset = queryset.prefetch_related(Prefetch('session', queryset=sessions))
+        elif not fields or 'is_late' in fields:
+            # is_late compares against the session start time
+            queryset = queryset.select_related('session')
+        return queryset
+
     def get_is_late(self, obj):
         return obj.is_late()
 
 
 class BarcodeAttendanceSerializer(serializers.Serializer):
+    """
+    Validates a scan against the cached roster of the session.
+
+    Warm scans are validated without touching the database; barcodes that
+    are missing from the roster fall back to a lookup so that stale rosters
+    never reject a valid scan.
+    """
     session_id = serializers.CharField()
     barcode_id = serializers.CharField()
 
@@ -170,25 +308,253 @@ class BarcodeAttendanceSerializer(serializers.Serializer):
         session_id = data.get('session_id')
         barcode_id = data.get('barcode_id')
 
-        try:
-            session = AttendanceSession.objects.get(session_id=session_id, status='active')
-        except AttendanceSession.DoesNotExist:
+        roster = get_session_roster(session_id)
+        if roster is None:
             raise serializers.ValidationError('Invalid or inactive session.')
 
+        student = roster.students.get(barcode_id)
+        if student is None:
+            student = self._lookup_student(roster, barcode_id)
+
+        # The roster is shared between requests, so hand out a private copy
+        data['session'] = copy.copy(roster.session)
+        data['student_pk'], data['student_number'] = student
+        return data
+
+    def _lookup_student(self, roster, barcode_id):
         try:
             student = Student.objects.get(barcode_id=barcode_id, is_active=True)
         except Student.DoesNotExist:
             raise serializers.ValidationError('Invalid barcode or inactive student.')
 
         # Check if student is enrolled in the course
-        if not session.course.students.filter(id=student.id).exists():
+        if student.pk not in roster.enrolled and not roster.session.course.students.filter(id=student.id).exists():
             raise serializers.ValidationError('Student is not enrolled in this course.')
 
-        data['session'] = session
-        data['student'] = student
+        # The student is valid but missing from the roster, so it is stale
+        invalidate_session_roster(roster.session.session_id)
+        return student.pk, student.student_id
+
+
+class FastBarcodeAttendanceSerializer(serializers.Serializer):
+    """
+    Validates a scan without loading any model instances.
+
+    Scans found in the cached session roster need no query at all. Otherwise
+    the session, the scanned student and the enrollment check are resolved
+    in one statement. Only plain values end up in ``validated_data``.
+    """
+    session_id = serializers.CharField()
+    barcode_id = serializers.CharField()
+
+    def validate(self, data):
+        roster = get_session_roster(data.get('session_id'))
+        student = roster.students.get(data.get('barcode_id')) if roster else None
+        if student is not None:
+            data['session_pk'] = roster.session.pk
+            data['start_time'] = roster.session.start_time
+            data['materialized'] = roster.session.roster_materialized
+            data['student_pk'], data['student_number'] = student
+            return data
+
+        barcode_id = data.get('barcode_id')
+        students = Student.objects.filter(barcode_id=barcode_id, is_active=True).order_by()
+        enrollment = Course.students.through.objects.filter(
+            course_id=OuterRef('course_id'),
+            student__barcode_id=barcode_id,
+            student__is_active=True,
+        )
+
+        rows = AttendanceSession.objects.filter(
+            session_id=data.get('session_id'), status='active'
+        ).annotate(
+            student_pk=Subquery(students.values('pk')[:1]),
+            student_number=Subquery(students.values('student_id')[:1]),
+            enrolled=Exists(enrollment),
+        ).order_by().values('pk', 'start_time', 'roster_materialized', 'student_pk', 'student_number', 'enrolled')[:1]
+
+        row = next(iter(rows), None)
+        if row is None:
+            raise serializers.ValidationError('Invalid or inactive session.')
+        if row['student_pk'] is None:
+            raise serializers.ValidationError('Invalid barcode or inactive student.')
+        if not row['enrolled']:
+            raise serializers.ValidationError('Student is not enrolled in this course.')
+
+        if roster is not None:
+            invalidate_session_roster(roster.session.session_id)
+        data['session_pk'] = row['pk']
+        data['start_time'] = row['start_time']
+        data['materialized'] = row['roster_materialized']
+        data['student_pk'] = row['student_pk']
+        data['student_number'] = row['student_number']
         return data
 
 
+class ScanSerializer(serializers.Serializer):
+    session_id = serializers.CharField()
+    barcode_id = serializers.CharField()
+    scanned_at = serializers.DateTimeField()
+
+
+class BatchAttendanceSerializer(serializers.Serializer):
+    """
+    Validates a batch of queued scans against the session rosters as a set.
+
+    Items are checked individually so one bad scan does not reject the whole
+    batch. ``validated_data['results']`` holds one entry per item, and
+    ``validated_data['records']`` the unsaved records to upsert. Lateness is
+    decided from the device's ``scanned_at``, not from the arrival time;
+    scans timed in the future, beyond ``SCAN_CLOCK_SKEW_SECONDS``, are
+    rejected, as an early check-in would otherwise displace every real one.
+    """
+    MAX_SCANS = 1000
+
+    scans = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=MAX_SCANS
+    )
+
+    def validate(self, data):
+        results = []
+        scans = []
+        for index, item in enumerate(data['scans']):
+            scan = ScanSerializer(data=item)
+            if scan.is_valid():
+                scans.append((index, scan.validated_data))
+                results.append(None)
+            else:
+                field, errors = next(iter(scan.errors.items()))
+                results.append(self._rejected(index, f'{field}: {errors[0]}'))
+
+        sessions = {
+            session['session_id']: session
+            for session in AttendanceSession.objects.filter(
+                session_id__in={scan['session_id'] for _, scan in scans}
+            ).exclude(status='cancelled').values(
+                'pk', 'session_id', 'course_id', 'start_time', 'end_time', 'status'
+            )
+        }
+        students = dict(
+            Student.objects.filter(
+                barcode_id__in={scan['barcode_id'] for _, scan in scans}, is_active=True
+            ).values_list('barcode_id', 'pk')
+        )
+        enrolled = set(
+            Course.students.through.objects.filter(
+                course_id__in={session['course_id'] for session in sessions.values()},
+                student_id__in=students.values(),
+            ).values_list('course_id', 'student_id')
+        )
+        checked_in = {
+            (session_pk, student_pk): (check_in_time, record_status)
+            for session_pk, student_pk, check_in_time, record_status in AttendanceRecord.objects.filter(
+                session_id__in=[session['pk'] for session in sessions.values()],
+                student_id__in=students.values(),
+            ).exclude(status='absent', check_in_time__isnull=True).values_list('session_id', 'student_id', 'check_in_time', 'status')
+        }
+
+        # Keep the earliest scan per (session, student); later ones are duplicates
+        latest = timezone.now() + timezone.timedelta(seconds=getattr(settings, 'SCAN_CLOCK_SKEW_SECONDS', 120))
+        earliest = {}
+        for index, scan in scans:
+            session = sessions.get(scan['session_id'])
+            student_pk = students.get(scan['barcode_id'])
+            if session is None:
+                results[index] = self._rejected(index, 'Invalid or cancelled session.')
+            elif student_pk is None:
+                results[index] = self._rejected(index, 'Invalid barcode or inactive student.')
+            elif (session['course_id'], student_pk) not in enrolled:
+                results[index] = self._rejected(index, 'Student is not enrolled in this course.')
+            elif scan['scanned_at'] > latest:
+                results[index] = self._rejected(index, 'Scan time is in the future; check the device clock.')
+            elif session['end_time'] and scan['scanned_at'] > session['end_time']:
+                results[index] = self._rejected(index, 'Scan was made after the session ended.')
+            else:
+                key = (session['pk'], student_pk)
+                if key not in earliest or scan['scanned_at'] < earliest[key][1]['scanned_at']:
+                    earliest[key] = (index, scan, session)
+
+        records = []
+        written = set()
+        for key, (index, scan, session) in earliest.items():
+            # Same rule as AttendanceRecord.check_in_guard(), which enforces it on write
+            previous = checked_in.get(key)
+            if previous and (previous[1] == 'excused' or previous[0] is None or previous[0] <= scan['scanned_at']):
+                continue
+            written.add(index)
+            record_status = AttendanceRecord.status_for_check_in(scan['scanned_at'], session['start_time'])
+            checked_in[key] = (scan['scanned_at'], record_status)
+            records.append(AttendanceRecord(
+                session_id=key[0],
+                student_id=key[1],
+                status=record_status,
+                check_in_time=scan['scanned_at'],
+                scanned_barcode=scan['barcode_id'],
+            ))
+
+        for index, scan in scans:
+            if results[index] is not None:
+                continue
+            key = (sessions[scan['session_id']]['pk'], students[scan['barcode_id']])
+            check_in_time, record_status = checked_in[key]
+            results[index] = {
+                'index': index,
+                'accepted': True,
+                'status': record_status,
+                'check_in_time': check_in_time,
+                'duplicate': index not in written,
+            }
+
+        data['results'] = results
+        data['records'] = records
+        return data
+
+    @staticmethod
+    def _rejected(index, error):
+        return {'index': index, 'accepted': False, 'error': error}
+
+
+class AttendanceRecordChangeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    session_id = serializers.CharField(source='session.session_id', read_only=True)
+    student_id = serializers.CharField(source='student.student_id', read_only=True)
+
+    class Meta:
+        model = AttendanceRecord
+        fields = [
+            'id', 'session_id', 'student_id', 'status', 'check_in_time',
+            'scanned_barcode', 'notes', 'created_at', 'updated_at'
+        ]
+
+
+class AttendanceSessionChangeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    course_code = serializers.CharField(source='course.course_code', read_only=True)
+    lecturer_id = serializers.CharField(source='lecturer.lecturer_id', read_only=True)
+
+    class Meta:
+        model = AttendanceSession
+        fields = [
+            'id', 'session_id', 'course_code', 'lecturer_id', 'date', 'start_time',
+            'end_time', 'status', 'session_name', 'location', 'roster_materialized',
+            'enrolled_count', 'present_count', 'late_count', 'excused_count',
+            'created_at', 'updated_at'
+        ]
+
+
+class ChangeFeedSerializer(serializers.Serializer):
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=1000, default=500)
+
+    def validate_cursor(self, value):
+        try:
+            return decode_cursor(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+
+class RosterDeltaSerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=1)
+
+
 class AttendanceReportSerializer(serializers.Serializer):
     course_id = serializers.IntegerField()
     start_date = serializers.DateField(required=False)
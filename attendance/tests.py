@@ -0,0 +1,392 @@
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from . import qr
+from .cache import get_session_roster
+from .id_cards import run_barcode_sheets_job
+from .models import Student, Lecturer, Course, AttendanceSession, AttendanceRecord, ExportJob, RosterChange, new_barcode_id
+
+
+class QueryCountTestCase(TestCase):
+    """
+    Builds courses of any size for a lecturer, so tests can check that a
+    view costs the same number of queries for small and large data.
+    """
+    def setUp(self):
+        user = User.objects.create_user('lecturer', password='password')
+        self.lecturer = Lecturer.objects.create(user=user, lecturer_id='LEC001', department='Computer Science')
+        self.client = APIClient()
+        # Loaded with its lecturer, as CachedTokenAuthentication does, so only the view's own queries are counted
+        self.client.force_authenticate(User.objects.select_related('lecturer').get(pk=user.pk))
+
+    def make_course(self, students, sessions, checked_in=None):
+        """
+        A course with ``students`` enrolled and ``sessions`` sessions, all
+        but the last one ended and rolled up. ``checked_in`` students (by
+        default half of them) check in to every session, the first one late.
+        """
+        course = Course.objects.create(
+            course_code=f'CS{Course.objects.count() + 101}', course_name='Course', lecturer=self.lecturer,
+            semester='First', academic_year='2025/2026',
+        )
+        first = Student.objects.count()
+        Student.objects.bulk_create([
+            Student(
+                student_id=f'STU{first + i:05d}', first_name='First', last_name=f'Last{i}',
+                email=f'student{first + i}@example.com', program='Computer Science', level='100',
+            )
+            for i in range(students)
+        ])
+        enrolled = list(Student.objects.order_by('-pk')[:students])
+        course.students.add(*enrolled)
+
+        checked_in = students // 2 if checked_in is None else checked_in
+        for n in range(sessions):
+            session = AttendanceSession.objects.create(course=course, lecturer=self.lecturer, session_name=f'Week {n + 1}')
+            now = timezone.now()
+            AttendanceRecord.objects.bulk_create([
+                AttendanceRecord(
+                    session=session, student=student, status='late' if i == 0 else 'present',
+                    check_in_time=now, scanned_barcode=student.barcode_id,
+                )
+                for i, student in enumerate(enrolled[:checked_in])
+            ])
+            AttendanceSession.objects.filter(pk=session.pk).refresh_counters()
+            if n < sessions - 1:
+                session.refresh_from_db()
+                session.end_session()
+        return course
+
+
+class AttendanceReportQueryTests(QueryCountTestCase):
+    def get_report(self, course):
+        response = self.client.get('/api/reports/attendance/', {'course_id': course.pk})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_count_is_independent_of_course_size(self):
+        small = self.make_course(students=2, sessions=1)
+        large = self.make_course(students=40, sessions=12)
+        # Course, its sessions and the enrollment count of the course
+        for course in (small, large):
+            with self.subTest(course=course.course_code), self.assertNumQueries(3):
+                self.get_report(course)
+
+    def test_breakdown(self):
+        course = self.make_course(students=5, sessions=3, checked_in=3)
+        report = self.get_report(course)
+        self.assertEqual(report['summary']['total_sessions'], 3)
+        for session in report['sessions']:
+            self.assertEqual(
+                (session['total_students'], session['present'], session['late'], session['absent']),
+                (5, 2, 1, 2),
+            )
+
+
+class ListViewQueryTests(QueryCountTestCase):
+    """
+    Each list view costs the same queries for a single short page as for
+    every page of a result longer than PAGE_SIZE (20).
+    """
+    def assert_pages(self, url, queries, rows, params=None):
+        """Follow ``url`` through its pages, each in ``queries`` queries, and check it lists ``rows``"""
+        seen = 0
+        while url:
+            with self.subTest(url=url, params=params), self.assertNumQueries(queries):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            seen += len(response.data['results'])
+            url, params = response.data['next'], None
+        self.assertEqual(seen, rows)
+
+    def test_courses(self):
+        self.make_course(students=1, sessions=1)
+        for params in (None, {'expand': 'lecturer'}):
+            self.assert_pages('/api/courses/', 1, 1, params)
+        for _ in range(24):
+            self.make_course(students=1, sessions=1)
+        for params in (None, {'expand': 'lecturer'}):
+            self.assert_pages('/api/courses/', 1, 25, params)
+
+    def test_sessions(self):
+        self.make_course(students=1, sessions=2)
+        self.assert_pages('/api/sessions/', 1, 2)
+        self.assert_pages('/api/sessions/', 2, 2, {'expand': 'course'})
+        self.make_course(students=1, sessions=23)
+        self.assert_pages('/api/sessions/', 1, 25)
+        self.assert_pages('/api/sessions/', 2, 25, {'expand': 'course'})
+
+    def test_attendance_records(self):
+        # Half of each course checks in, and only those records are listed
+        for students in (4, 50):
+            session = self.make_course(students=students, sessions=1).attendance_sessions.get()
+            url = f'/api/attendance/session/{session.session_id}/'
+            self.assert_pages(url, 2, students // 2)
+            self.assert_pages(url, 3, students // 2, {'expand': 'session'})
+            self.assert_pages(url, 4, students // 2, {'expand': 'session.course'})
+
+    def test_students(self):
+        small = self.make_course(students=3, sessions=1)
+        self.assert_pages('/api/students/', 1, 3)
+        self.assert_pages('/api/students/', 2, 3, {'course_id': small.pk})
+        large = self.make_course(students=25, sessions=1)
+        self.assert_pages('/api/students/', 1, 28)
+        self.assert_pages('/api/students/', 2, 25, {'course_id': large.pk})
+
+
+class BatchRollupTests(QueryCountTestCase):
+    def test_scans_synced_after_a_session_ended_update_its_rollups(self):
+        course = self.make_course(students=4, sessions=2, checked_in=1)
+        session = course.attendance_sessions.get(status='ended')
+        self.assertEqual((session.absent_count, course.attendance_summary.absent), (3, 3))
+
+        student = course.students.order_by('pk').first()
+        response = self.client.post('/api/attendance/record/batch/', {'scans': [{
+            'session_id': str(session.session_id), 'barcode_id': student.barcode_id,
+            'scanned_at': session.start_time.isoformat(),
+        }]}, format='json')
+        self.assertEqual(response.data['accepted'], 1)
+
+        session.refresh_from_db()
+        course.attendance_summary.refresh_from_db()
+        self.assertEqual((session.present_count, session.absent_count), (1, 2))
+        self.assertEqual((course.attendance_summary.present, course.attendance_summary.absent), (1, 2))
+        self.assertEqual(student.course_attendance.get(course=course).present, 1)
+
+
+class ExportJobStatusTests(QueryCountTestCase):
+    def test_jobs_no_worker_claims_are_reported(self):
+        course = self.make_course(students=1, sessions=1)
+        job = ExportJob.request_export(self.lecturer.user, course=course)
+        self.client.force_login(self.lecturer.user)
+        url = reverse('attendance_web:export_job_status', args=[job.job_id])
+        self.assertFalse(self.client.get(url).json()['unclaimed'])
+
+        ExportJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - timezone.timedelta(minutes=5))
+        self.assertTrue(self.client.get(url).json()['unclaimed'])
+        self.assertEqual(list(ExportJob.unclaimed()), [job])
+
+
+class BarcodeSheetsTests(QueryCountTestCase):
+    def test_renders_in_process(self):
+        self.make_course(students=3, sessions=1)
+        admin = User.objects.create_superuser('admin', password='password')
+        self.client.force_login(admin)
+        with mock.patch('attendance.barcodes.ProcessPoolExecutor') as pool:
+            response = self.client.get(reverse('attendance_web:barcode_sheets'))
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        pool.assert_not_called()
+
+    def test_large_runs_are_queued_for_the_export_worker(self):
+        self.make_course(students=3, sessions=1)
+        admin = User.objects.create_superuser('admin', password='password')
+        self.client.force_login(admin)
+        with override_settings(BARCODE_SHEETS_SYNC_LIMIT=2):
+            response = self.client.get(reverse('attendance_web:barcode_sheets'))
+        job = ExportJob.objects.get()
+        self.assertEqual((job.kind, job.status), ('barcode_sheets', 'pending'))
+        self.assertRedirects(response, f"{reverse('attendance_web:manage_students')}?sheets_job={job.job_id}")
+
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            run_barcode_sheets_job(ExportJob.claim_next())
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.rows_written), ('done', 3))
+            response = self.client.get(reverse('attendance_web:export_job_download', args=[job.job_id]))
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+            response.close()
+
+
+class ManageStudentsTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_course(students=25, sessions=1)
+        self.client.force_login(User.objects.create_superuser('admin', password='password'))
+
+    def test_students_are_only_counted_for_a_search(self):
+        url = reverse('attendance_web:manage_students')
+        self.assertIsNone(self.client.get(url).context['students_count'])
+        self.assertEqual(self.client.get(url, {'search': 'Last1'}).context['students_count'], 11)
+
+    def test_pending_barcodes_are_shown_on_demand(self):
+        student = Student.objects.order_by('student_id').first()
+        self.assertEqual(student.barcode_status, 'pending')
+        self.assertFalse(student.barcode_image)
+        response = self.client.get(reverse('attendance_web:manage_students'))
+        self.assertContains(response, reverse('attendance_web:show_barcode', args=[student.pk]))
+        self.assertNotContains(response, reverse('attendance_web:generate_barcode', args=[student.pk]))
+
+
+class CheckInCounterTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.session = self.make_course(students=2, sessions=1, checked_in=0).attendance_sessions.get()
+        self.student = self.session.course.students.order_by('pk').first()
+
+    def check_in(self, minutes):
+        return AttendanceRecord.upsert_check_in(
+            self.session.pk, self.student.pk, self.session.start_time,
+            check_in_time=self.session.start_time + timezone.timedelta(minutes=minutes),
+        )
+
+    def assert_counters(self, present, late):
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.present_count, self.session.late_count), (present, late))
+        self.assertEqual(
+            AttendanceSession.objects.filter(pk=self.session.pk).refresh_counters(enrolled=False), 1
+        )
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.present_count, self.session.late_count), (present, late))
+
+    def test_repeat_scans_count_once(self):
+        self.assertTrue(self.check_in(1)[1])
+        record, checked_in = self.check_in(2)
+        self.assertFalse(checked_in)
+        self.assertEqual(record.status, 'present')
+        self.assert_counters(present=1, late=0)
+
+    def test_an_earlier_scan_moves_the_count_to_its_status(self):
+        self.assertEqual(self.check_in(60)[0].status, 'late')
+        self.assert_counters(present=0, late=1)
+        record, checked_in = self.check_in(1)
+        self.assertTrue(checked_in)
+        self.assertEqual(record.status, 'present')
+        self.assert_counters(present=1, late=0)
+
+    def test_an_earlier_scan_with_the_same_status_keeps_the_count(self):
+        self.check_in(5)
+        self.assertTrue(self.check_in(1)[1])
+        self.assert_counters(present=1, late=0)
+
+    def test_a_correction_waits_for_the_records_own_count(self):
+        # Inserted by a concurrent scan whose counter increment has not run yet
+        AttendanceRecord.objects.create(
+            session=self.session, student=self.student, status='late',
+            check_in_time=self.session.start_time + timezone.timedelta(minutes=60),
+        )
+        record, checked_in = self.check_in(1)
+        self.assertFalse(checked_in)
+        self.assertEqual(record.status, 'late')
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.present_count, self.session.late_count), (0, 0))
+
+    def test_excused_records_are_not_checked_in(self):
+        AttendanceRecord.objects.create(session=self.session, student=self.student, status='excused')
+        record, checked_in = self.check_in(1)
+        self.assertFalse(checked_in)
+        self.assertEqual(record.status, 'excused')
+        self.assert_counters(present=0, late=0)
+
+
+class StudentAdminActionTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.course = self.make_course(students=3, sessions=1, checked_in=0)
+        self.client.force_login(User.objects.create_superuser('admin', password='password'))
+
+    def run_action(self, action, is_active):
+        students = list(self.course.students.values_list('pk', flat=True))
+        response = self.client.post(
+            f'/admin/attendance/student/?is_active__exact={int(is_active)}',
+            {'action': action, '_selected_action': students},
+        )
+        return [str(message) for message in get_messages(response.wsgi_request)][-1]
+
+    def test_deactivate_from_a_filtered_changelist(self):
+        session = self.course.attendance_sessions.get()
+        self.assertIsNotNone(get_session_roster(session.session_id))
+
+        self.assertEqual(self.run_action('deactivate_students', is_active=True), 'Deactivated 3 students.')
+        self.assertFalse(Student.objects.filter(is_active=True).exists())
+        # The next scan reloads the roster, without the deactivated students
+        self.assertEqual(get_session_roster(session.session_id).students, {})
+
+        self.assertEqual(self.run_action('activate_students', is_active=False), 'Activated 3 students.')
+
+    def test_actions_are_logged_in_the_roster_change_feed(self):
+        students = set(self.course.students.values_list('pk', flat=True))
+        version = Course.objects.get(pk=self.course.pk).roster_version
+        self.run_action('deactivate_students', is_active=True)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.roster_version, version + 1)
+        self.assertEqual(RosterChange.since(self.course, version), (set(), students, set()))
+
+
+class BatchScanTimeTests(QueryCountTestCase):
+    def test_scans_from_the_future_are_rejected(self):
+        course = self.make_course(students=2, sessions=1, checked_in=0)
+        session = course.attendance_sessions.get()
+        ahead, behind = course.students.order_by('pk')
+        now = timezone.now()
+        response = self.client.post('/api/attendance/record/batch/', {'scans': [
+            {'session_id': str(session.session_id), 'barcode_id': ahead.barcode_id,
+             'scanned_at': (now + timezone.timedelta(hours=1)).isoformat()},
+            {'session_id': str(session.session_id), 'barcode_id': behind.barcode_id,
+             'scanned_at': (now + timezone.timedelta(seconds=30)).isoformat()},
+        ]}, format='json')
+        self.assertEqual(response.data['results'][0]['error'], 'Scan time is in the future; check the device clock.')
+        # Within SCAN_CLOCK_SKEW_SECONDS
+        self.assertTrue(response.data['results'][1]['accepted'])
+        self.assertFalse(AttendanceRecord.objects.filter(student=ahead).exists())
+
+
+class FastCheckInQueryTests(QueryCountTestCase):
+    def scan(self, session, student):
+        response = self.client.post('/api/attendance/record/fast/', {
+            'session_id': str(session.session_id), 'barcode_id': student.barcode_id,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_a_warm_scan_costs_two_queries(self):
+        for materialized in (False, True):
+            with self.subTest(materialized=materialized):
+                course = self.make_course(students=3, sessions=1, checked_in=0)
+                session = course.attendance_sessions.get()
+                if materialized:
+                    session.materialize_roster()
+                first, second, _ = course.students.order_by('pk')
+                self.scan(session, first)
+
+                with self.assertNumQueries(2):
+                    data = self.scan(session, second)
+                self.assertEqual(data['message'], 'Attendance recorded successfully')
+                session.refresh_from_db()
+                self.assertEqual(session.present_count, 2)
+
+
+class QRRenderTests(TestCase):
+    def test_png_matches_qrcode_image(self):
+        for size in (1, 10):
+            code = qr.make_qr(new_barcode_id(), size)
+            expected = code.make_image(fill_color="black", back_color="white").get_image().convert('1')
+            rendered = Image.open(BytesIO(qr.render_png(code.get_matrix(), size)))
+            self.assertEqual((rendered.mode, rendered.size), ('1', expected.size))
+            self.assertEqual(rendered.tobytes(), expected.tobytes())
+
+
+class CourseDetailETagTests(QueryCountTestCase):
+    def test_each_representation_has_its_own_etag(self):
+        course = self.make_course(students=2, sessions=1)
+        url = f'/api/courses/{course.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        for params in ({'fields': 'id,course_code'}, {'expand': 'students'}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+        # The same selection in another order is the same body
+        sparse = self.client.get(url, {'fields': 'id,course_code'})['ETag']
+        self.assertEqual(self.client.get(url, {'fields': 'course_code,id'})['ETag'], sparse)
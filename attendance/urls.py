@@ -11,6 +11,7 @@ urlpatterns = [
     # Courses
     path('courses/', views.CourseListView.as_view(), name='course-list'),
     path('courses/<int:pk>/', views.CourseDetailView.as_view(), name='course-detail'),
+    path('courses/<int:pk>/roster/', views.course_roster_changes, name='course-roster-changes'),
     
     # Attendance Sessions
     path('sessions/', views.AttendanceSessionListCreateView.as_view(), name='session-list-create'),
@@ -20,11 +21,20 @@ urlpatterns = [
     
     # Attendance Recording
     path('attendance/record/', views.record_attendance, name='record-attendance'),
+    path('attendance/record/fast/', views.record_attendance_fast, name='record-attendance-fast'),
+    path('attendance/record/batch/', views.record_attendance_batch, name='record-attendance-batch'),
+    path('attendance/stats/', views.scan_cache_stats, name='scan-cache-stats'),
     path('attendance/session/<str:session_id>/', views.AttendanceRecordListView.as_view(), name='session-attendance'),
     
     # Reports and Export
     path('reports/attendance/', views.attendance_report, name='attendance-report'),
     path('reports/export/csv/', views.export_attendance_csv, name='export-csv'),
+    path('reports/matrix/', views.attendance_matrix, name='attendance-matrix'),
+    path('reports/matrix/csv/', views.export_attendance_matrix_csv, name='attendance-matrix-csv'),
+    
+    # Change feeds
+    path('changes/records/', views.record_changes, name='record-changes'),
+    path('changes/sessions/', views.session_changes, name='session-changes'),
     
     # Students
     path('students/', views.StudentListView.as_view(), name='student-list'),
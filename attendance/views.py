@@ -5,17 +5,29 @@ from rest_framework.authtoken.models import Token
 from django.contrib.auth import login
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.http import HttpResponse
+from django.db import transaction
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-import csv
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from functools import wraps
+import hashlib
+import json
 from datetime import datetime, timedelta
 
-from .models import Student, Lecturer, Course, AttendanceSession, AttendanceRecord
+from .models import Student, Lecturer, Course, AttendanceSession, AttendanceRecord, RosterChange
+from .cache import roster_cache, scan_debounce, idempotent_responses, invalidate_user_tokens
+from .exports import attendance_rows, streaming_csv_response
+from .reports import AttendanceMatrix
+from .rollups import rebuild_course_rollups
+from .pagination import after_position, encode_cursor
 from .serializers import (
     LoginSerializer, StudentSerializer, LecturerSerializer, CourseSerializer,
     CourseDetailSerializer, AttendanceSessionSerializer, AttendanceSessionCreateSerializer,
-    AttendanceRecordSerializer, BarcodeAttendanceSerializer, AttendanceReportSerializer
+    AttendanceRecordSerializer, BarcodeAttendanceSerializer, FastBarcodeAttendanceSerializer,
+    BatchAttendanceSerializer, AttendanceReportSerializer, AttendanceRecordChangeSerializer,
+    AttendanceSessionChangeSerializer, ChangeFeedSerializer, RosterDeltaSerializer, requested_fields
 )
 
 
@@ -65,36 +77,118 @@ def logout_view(request):
             token.delete()
         except Token.DoesNotExist:
             pass
+        invalidate_user_tokens(request.user.pk)
     
     return Response({'message': 'Logged out successfully'})
 
 
 class CourseListView(generics.ListAPIView):
+    """Query budget: 1 query per page after authentication, with or without ?expand=lecturer"""
     serializer_class = CourseSerializer
+    keyset_ordering = ['course_code']
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         try:
             lecturer = self.request.user.lecturer
-            return Course.objects.filter(lecturer=lecturer, is_active=True)
+            return CourseSerializer.setup_eager_loading(
+                Course.objects.filter(lecturer=lecturer, is_active=True), *requested_fields(self.request)
+            )
         except Lecturer.DoesNotExist:
             return Course.objects.none()
 
 
 class CourseDetailView(generics.RetrieveAPIView):
+    """
+    Query budget: 3 queries (version, course and student ids) after
+    authentication, with or without ?expand=students.
+
+    Responses carry a strong ETag built from the course and roster versions;
+    a matching If-None-Match is answered 304 after the version query, without
+    serializing anything.
+    """
     serializer_class = CourseDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
+    def get_courses(self):
         try:
-            lecturer = self.request.user.lecturer
-            return Course.objects.filter(lecturer=lecturer, is_active=True)
+            return Course.objects.filter(lecturer=self.request.user.lecturer, is_active=True)
         except Lecturer.DoesNotExist:
             return Course.objects.none()
 
+    def get_queryset(self):
+        return CourseDetailSerializer.setup_eager_loading(self.get_courses(), *requested_fields(self.request))
+
+    def get_etag(self):
+        fields, expand = requested_fields(self.request)
+        if 'lecturer' in expand:
+            # Lecturer details are not versioned
+            return None
+        row = self.get_courses().filter(pk=self.kwargs['pk']).values_list('roster_version', 'updated_at').first()
+        if row is None:
+            return None
+        roster_version, updated_at = row
+        # ?fields= and ?expand= select different bodies of the same version
+        variant = hashlib.sha256(json.dumps([sorted(fields or []), expand], sort_keys=True).encode()).hexdigest()[:16]
+        return quote_etag(
+            f"{self.kwargs['pk']}-{roster_version}-{updated_at.timestamp():f}-{self.request.accepted_renderer.format}-{variant}"
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        etag = self.get_etag()
+        if etag:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+        response = super().retrieve(request, *args, **kwargs)
+        if etag:
+            response['ETag'] = etag
+        # Clients may keep the roster but must revalidate it before use
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+@api_view(['GET'])
+def course_roster_changes(request, pk):
+    """
+    Students added to, changed in or removed from a course roster since
+    ``?since=<roster_version>``.
+
+    Added and changed students are returned in full, removed ones as ids.
+    """
+    params = RosterDeltaSerializer(data=request.GET)
+    if not params.is_valid():
+        return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        lecturer = request.user.lecturer
+    except Lecturer.DoesNotExist:
+        return Response({
+            'error': 'Only lecturers can access course rosters.'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    course = get_object_or_404(Course, pk=pk, lecturer=lecturer, is_active=True)
+    since = params.validated_data['since']
+    if since > course.roster_version:
+        return Response({
+            'error': 'Unknown roster version.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    added, changed, removed = RosterChange.since(course, since)
+    students = Student.objects.filter(pk__in=added | changed).order_by('student_id')
+    context = {'request': request}
+    return Response({
+        'course': course.pk,
+        'roster_version': course.roster_version,
+        'added': StudentSerializer([s for s in students if s.pk in added], many=True, context=context).data,
+        'changed': StudentSerializer([s for s in students if s.pk in changed], many=True, context=context).data,
+        'removed': sorted(removed),
+    })
+
 
 class AttendanceSessionListCreateView(generics.ListCreateAPIView):
+    """Query budget for GET: 1 query per page after authentication, plus 1 for ?expand=course"""
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ['-start_time', 'id']
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -104,19 +198,25 @@ class AttendanceSessionListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         try:
             lecturer = self.request.user.lecturer
-            return AttendanceSession.objects.filter(lecturer=lecturer).order_by('-start_time')
+            sessions = AttendanceSession.objects.filter(lecturer=lecturer).order_by('-start_time')
+            if self.request.method == 'GET':
+                sessions = AttendanceSessionSerializer.setup_eager_loading(sessions, *requested_fields(self.request))
+            return sessions
         except Lecturer.DoesNotExist:
             return AttendanceSession.objects.none()
 
 
 class AttendanceSessionDetailView(generics.RetrieveUpdateAPIView):
+    """Query budget for GET: 1 query (session) after authentication, plus 1 for ?expand=course"""
     serializer_class = AttendanceSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         try:
             lecturer = self.request.user.lecturer
-            return AttendanceSession.objects.filter(lecturer=lecturer)
+            return AttendanceSessionSerializer.setup_eager_loading(
+                AttendanceSession.objects.filter(lecturer=lecturer), *requested_fields(self.request)
+            )
         except Lecturer.DoesNotExist:
             return AttendanceSession.objects.none()
 
@@ -125,16 +225,12 @@ class AttendanceSessionDetailView(generics.RetrieveUpdateAPIView):
 def start_attendance_session(request):
     serializer = AttendanceSessionCreateSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
-        session = serializer.save()
-        
-        # Create attendance records for all students in the course
-        students = session.course.students.all()
-        for student in students:
-            AttendanceRecord.objects.create(
-                session=session,
-                student=student,
-                status='absent'
-            )
+        with transaction.atomic():
+            session = serializer.save()
+            
+            # Create attendance records for all students in the course
+            if settings.ATTENDANCE_MATERIALIZE_ABSENCES:
+                session.materialize_roster()
         
         response_serializer = AttendanceSessionSerializer(session, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
@@ -163,39 +259,178 @@ def end_attendance_session(request, session_id):
     return Response(serializer.data)
 
 
+def idempotent(view_func):
+    """
+    Replay the stored response for requests repeating an ``Idempotency-Key``.
+
+    Only successful responses are stored, so a failed request can be retried
+    with the same key.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view_func(request, *args, **kwargs)
+
+        cache_key = (request.user.pk, request.path, key)
+        stored = idempotent_responses.get(cache_key)
+        if stored is not None:
+            data, status_code = stored
+            response = Response(data, status=status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        response = view_func(request, *args, **kwargs)
+        if status.is_success(response.status_code):
+            idempotent_responses.set(cache_key, (response.data, response.status_code))
+        return response
+    return wrapper
+
+
 @api_view(['POST'])
+@idempotent
 def record_attendance(request):
     serializer = BarcodeAttendanceSerializer(data=request.data)
     if serializer.is_valid():
         session = serializer.validated_data['session']
-        student = serializer.validated_data['student']
+        student_pk = serializer.validated_data['student_pk']
         
-        # Get or create attendance record
-        attendance_record, created = AttendanceRecord.objects.get_or_create(
-            session=session,
-            student=student,
-            defaults={'status': 'absent'}
-        )
-        
-        # Mark as present
-        attendance_record.mark_present(serializer.validated_data['barcode_id'])
+        # Repeat scans this process saw within the debounce window are answered
+        # from memory; the conditional upsert is what keeps a check-in from
+        # being overwritten by a later scan
+        debounce_key = ('full', session.pk, student_pk)
+        previous = scan_debounce.get(debounce_key)
+        if previous is not None:
+            return Response({
+                'message': 'Attendance already recorded',
+                'attendance': previous
+            })
         
-        # Check if late
-        if attendance_record.is_late():
-            attendance_record.status = 'late'
-            attendance_record.save()
+        _, checked_in = AttendanceRecord.upsert_check_in(
+            session.pk, student_pk, session.start_time, barcode_id=serializer.validated_data['barcode_id'],
+            materialized=session.roster_materialized,
+        )
+        if checked_in:
+            session.refresh_from_db(fields=['enrolled_count', 'present_count', 'late_count', 'excused_count'])
+        attendance_record = AttendanceRecord.objects.get(session=session, student_id=student_pk)
+        attendance_record.session = session
         
         response_serializer = AttendanceRecordSerializer(attendance_record, context={'request': request})
+        scan_debounce.set(debounce_key, response_serializer.data)
         return Response({
-            'message': 'Attendance recorded successfully',
+            'message': 'Attendance recorded successfully' if checked_in else 'Attendance already recorded',
             'attendance': response_serializer.data
         })
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@idempotent
+def record_attendance_fast(request):
+    """
+    Fast-path check-in for scanner devices.
+
+    Query budget (excluding authentication): two queries per scan - an
+    INSERT of the record with the present/late status already decided (or,
+    in sessions with materialized absences, a conditional UPDATE of the
+    absent record), and one UPDATE of the session counters. The counter is
+    incremented with F(), not recounted, so it costs the same whatever the
+    size of the session. A student already checked in costs a SELECT of the
+    stored record on top.
+
+    Scans are validated from the cached session roster; the first scan of a
+    session pays two extra queries to load it, and barcodes missing from the
+    roster one query that validates the session, barcode and enrollment
+    together.
+    """
+    serializer = FastBarcodeAttendanceSerializer(data=request.data)
+    if serializer.is_valid():
+        data = serializer.validated_data
+
+        # Answers repeat scans from memory; upsert_check_in() guards the record
+        debounce_key = ('fast', data['session_pk'], data['student_pk'])
+        previous = scan_debounce.get(debounce_key)
+        if previous is not None:
+            return Response({
+                'message': 'Attendance already recorded',
+                'attendance': previous
+            })
+
+        record, checked_in = AttendanceRecord.upsert_check_in(
+            data['session_pk'],
+            data['student_pk'],
+            data['start_time'],
+            barcode_id=data['barcode_id'],
+            materialized=data['materialized'],
+        )
+        attendance = {
+            'session_id': data['session_id'],
+            'student_id': data['student_number'],
+            'status': record.status,
+            'check_in_time': record.check_in_time,
+            'is_late': record.status == 'late',
+        }
+        scan_debounce.set(debounce_key, attendance)
+        return Response({
+            'message': 'Attendance recorded successfully' if checked_in else 'Attendance already recorded',
+            'attendance': attendance
+        })
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@idempotent
+def record_attendance_batch(request):
+    """
+    Ingest scans queued offline by a scanner device.
+
+    Expects ``{"scans": [{"session_id", "barcode_id", "scanned_at"}, ...]}``
+    and returns one accepted/rejected result per item, in request order.
+    All accepted scans are written with bulk upserts in one transaction.
+    """
+    serializer = BatchAttendanceSerializer(data=request.data)
+    if serializer.is_valid():
+        results = serializer.validated_data['results']
+        records = serializer.validated_data['records']
+        with transaction.atomic():
+            AttendanceRecord.bulk_upsert_check_ins(records)
+            sessions = AttendanceSession.objects.filter(pk__in={record.session_id for record in records})
+            sessions.refresh_counters(enrolled=False)
+            # Scans synced after a session ended change its frozen absences and the course rollups
+            for course in Course.objects.filter(pk__in=sessions.filter(rolled_up=True).values('course_id')):
+                rebuild_course_rollups(course)
+
+        accepted = sum(1 for result in results if result['accepted'])
+        return Response({
+            'message': f'Processed {len(results)} scans',
+            'accepted': accepted,
+            'rejected': len(results) - accepted,
+            'results': results,
+        })
+
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def scan_cache_stats(request):
+    """Hit/miss counters of the caches used by the check-in endpoints"""
+    return Response({
+        'roster': roster_cache.stats(),
+        'debounce': scan_debounce.stats(),
+        'idempotency': idempotent_responses.stats(),
+    })
+
+
 class AttendanceRecordListView(generics.ListAPIView):
+    """
+    Query budget: 2 queries per page (session and records) after
+    authentication, plus 1 for ?expand=session and 1 for ?expand=session.course
+    """
     serializer_class = AttendanceRecordSerializer
+    keyset_ordering = ['student__student_id', 'id']
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -204,10 +439,10 @@ class AttendanceRecordListView(generics.ListAPIView):
             lecturer = self.request.user.lecturer
             session = AttendanceSession.objects.get(session_id=session_id, lecturer=lecturer)
             # Only return records where students have been scanned (have check_in_time)
-            return AttendanceRecord.objects.filter(
+            return AttendanceRecordSerializer.setup_eager_loading(AttendanceRecord.objects.filter(
                 session=session, 
                 check_in_time__isnull=False
-            ).order_by('student__student_id')
+            ), *requested_fields(self.request)).order_by('student__student_id')
         except (Lecturer.DoesNotExist, AttendanceSession.DoesNotExist):
             return AttendanceRecord.objects.none()
 
@@ -223,7 +458,7 @@ def attendance_report(request):
         # Check if lecturer owns the course
         try:
             lecturer = request.user.lecturer
-            if course.lecturer != lecturer:
+            if course.lecturer_id != lecturer.pk:
                 return Response({
                     'error': 'Access denied to this course.'
                 }, status=status.HTTP_403_FORBIDDEN)
@@ -239,18 +474,18 @@ def attendance_report(request):
         if end_date:
             sessions = sessions.filter(date__lte=end_date)
         
-        # Get attendance data
+        # Get attendance data from the session counters and rollups
         report_data = []
         for session in sessions.order_by('date'):
-            records = AttendanceRecord.objects.filter(session=session)
+            breakdown = session.status_breakdown
             session_data = {
                 'session_id': session.session_id,
                 'date': session.date,
                 'session_name': session.session_name,
-                'total_students': records.count(),
-                'present': records.filter(status='present').count(),
-                'late': records.filter(status='late').count(),
-                'absent': records.filter(status='absent').count(),
+                'total_students': breakdown['total'],
+                'present': breakdown['present'],
+                'late': breakdown['late'],
+                'absent': breakdown['absent'],
                 'attendance_rate': session.attendance_rate,
             }
             report_data.append(session_data)
@@ -278,7 +513,7 @@ def export_attendance_csv(request):
         # Check if lecturer owns the course
         try:
             lecturer = request.user.lecturer
-            if course.lecturer != lecturer:
+            if course.lecturer_id != lecturer.pk:
                 return Response({
                     'error': 'Access denied to this course.'
                 }, status=status.HTTP_403_FORBIDDEN)
@@ -287,13 +522,6 @@ def export_attendance_csv(request):
                 'error': 'Only lecturers can access reports.'
             }, status=status.HTTP_403_FORBIDDEN)
         
-        # Create HTTP response with CSV content
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="attendance_{course.course_code}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Date', 'Student ID', 'Student Name', 'Status', 'Check-in Time'])
-        
         # Filter sessions
         sessions = AttendanceSession.objects.filter(course=course)
         if start_date:
@@ -301,25 +529,169 @@ def export_attendance_csv(request):
         if end_date:
             sessions = sessions.filter(date__lte=end_date)
         
-        # Write attendance data
-        for session in sessions.order_by('date'):
-            records = AttendanceRecord.objects.filter(session=session).select_related('student')
-            for record in records:
-                writer.writerow([
-                    session.date.strftime('%Y-%m-%d'),
-                    record.student.student_id,
-                    f"{record.student.first_name} {record.student.last_name}",
-                    record.status.title(),
-                    record.check_in_time.strftime('%H:%M:%S') if record.check_in_time else '',
-                ])
-        
-        return response
+        rows = (
+            [
+                row['session__date'].strftime('%Y-%m-%d'),
+                row['student__student_id'],
+                f"{row['student__first_name']} {row['student__last_name']}",
+                row['status'].title(),
+                row['check_in_time'].strftime('%H:%M:%S') if row['check_in_time'] else '',
+            ]
+            for row in attendance_rows(sessions)
+        )
+        return streaming_csv_response(
+            request, f"attendance_{course.course_code}.csv",
+            ['Date', 'Student ID', 'Student Name', 'Status', 'Check-in Time'], rows
+        )
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+
+def _attendance_matrix(request):
+    """Build the matrix for a report request, or return the error Response"""
+    serializer = AttendanceReportSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    course = serializer.validated_data['course']
+    start_date = serializer.validated_data.get('start_date')
+    end_date = serializer.validated_data.get('end_date')
+    
+    # Check if lecturer owns the course
+    try:
+        lecturer = request.user.lecturer
+        if course.lecturer != lecturer:
+            return Response({
+                'error': 'Access denied to this course.'
+            }, status=status.HTTP_403_FORBIDDEN)
+    except Lecturer.DoesNotExist:
+        return Response({
+            'error': 'Only lecturers can access reports.'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    sessions = AttendanceSession.objects.filter(course=course).exclude(status='cancelled')
+    if start_date:
+        sessions = sessions.filter(date__gte=start_date)
+    if end_date:
+        sessions = sessions.filter(date__lte=end_date)
+    return AttendanceMatrix(course, sessions)
+
+
+@api_view(['GET'])
+def attendance_matrix(request):
+    """
+    Students x sessions attendance grid of a course.
+
+    Each student row is a string with one letter per session: P(resent),
+    L(ate), A(bsent), E(xcused) or - (no record).
+    """
+    matrix = _attendance_matrix(request)
+    if isinstance(matrix, Response):
+        return matrix
+    
+    return Response({
+        'sessions': [
+            {
+                'session_id': session_id,
+                'date': date,
+                'session_name': session_name,
+                **matrix.summarize(matrix.session_cells(j)),
+            }
+            for j, (_, session_id, date, session_name, _) in enumerate(matrix.sessions)
+        ],
+        'students': [
+            {
+                'student_id': student_id,
+                'name': f"{first_name} {last_name}",
+                'attendance': matrix.student_row(i),
+                **matrix.summarize(matrix.student_cells(i)),
+            }
+            for i, (_, student_id, first_name, last_name) in enumerate(matrix.students)
+        ],
+    })
+
+
+@api_view(['GET'])
+def export_attendance_matrix_csv(request):
+    matrix = _attendance_matrix(request)
+    if isinstance(matrix, Response):
+        return matrix
+    
+    statuses = {'P': 'Present', 'L': 'Late', 'A': 'Absent', 'E': 'Excused', '-': ''}
+    header = ['Student ID', 'Student Name']
+    header += [f"{date} {session_name}".strip() for _, _, date, session_name, _ in matrix.sessions]
+    header += ['Present', 'Late', 'Absent', 'Excused', 'Attendance Rate']
+    
+    def rows():
+        for i, (_, student_id, first_name, last_name) in enumerate(matrix.students):
+            summary = matrix.summarize(matrix.student_cells(i))
+            yield (
+                [student_id, f"{first_name} {last_name}"]
+                + [statuses[letter] for letter in matrix.student_row(i)]
+                + [summary['present'], summary['late'], summary['absent'], summary['excused'], summary['attendance_rate']]
+            )
+    
+    return streaming_csv_response(request, f"attendance_matrix_{matrix.course.course_code}.csv", header, rows())
+
+def _change_feed(request, queryset, serializer_class):
+    """
+    One page of rows changed after the request cursor, in (updated_at, pk) order.
+
+    Clients resume from ``next_cursor``; an empty page hands their cursor back.
+    """
+    params = ChangeFeedSerializer(data=request.GET)
+    if not params.is_valid():
+        return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+    cursor = params.validated_data.get('cursor')
+    limit = params.validated_data['limit']
+
+    settled = timezone.now() - timedelta(seconds=getattr(settings, 'CHANGE_FEED_SETTLE_SECONDS', 5))
+    queryset = queryset.filter(updated_at__lt=settled)
+    if cursor:
+        queryset = after_position(queryset, *cursor)
+    rows = list(queryset.order_by('updated_at', 'pk')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return Response({
+        'results': serializer_class(rows, many=True, context={'request': request}).data,
+        'next_cursor': encode_cursor(rows[-1].updated_at, rows[-1].pk) if rows else request.GET.get('cursor'),
+        'has_more': has_more,
+    })
+
+
+@api_view(['GET'])
+def record_changes(request):
+    """Attendance records created or updated since a cursor"""
+    records = AttendanceRecord.objects.select_related('session', 'student')
+    if not request.user.is_superuser:
+        try:
+            records = records.filter(session__lecturer=request.user.lecturer)
+        except Lecturer.DoesNotExist:
+            return Response({
+                'error': 'Only lecturers can access attendance changes.'
+            }, status=status.HTTP_403_FORBIDDEN)
+    return _change_feed(request, records, AttendanceRecordChangeSerializer)
+
+
+@api_view(['GET'])
+def session_changes(request):
+    """Attendance sessions created or updated since a cursor"""
+    sessions = AttendanceSession.objects.select_related('course', 'lecturer')
+    if not request.user.is_superuser:
+        try:
+            sessions = sessions.filter(lecturer=request.user.lecturer)
+        except Lecturer.DoesNotExist:
+            return Response({
+                'error': 'Only lecturers can access attendance changes.'
+            }, status=status.HTTP_403_FORBIDDEN)
+    return _change_feed(request, sessions, AttendanceSessionChangeSerializer)
+
+
 class StudentListView(generics.ListAPIView):
+    """Query budget: 1 query per page after authentication, plus 1 to check a course_id"""
     serializer_class = StudentSerializer
+    keyset_ordering = ['student_id']
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -14,6 +14,7 @@ urlpatterns = [
     path('courses/<int:course_id>/', web_views.course_detail, name='course-detail'),
     path('sessions/', web_views.session_list, name='session-list'),
     path('sessions/<str:session_id>/', web_views.session_detail, name='session-detail'),
+    path('sessions/<str:session_id>/events/', web_views.session_events, name='session-events'),
     path('students/', web_views.student_list, name='student-list'),
     
     # Debug route
@@ -34,6 +35,9 @@ urlpatterns = [
     path('export/courses/', web_views.export_courses_csv, name='export_courses'),
     path('export/attendance/', web_views.export_attendance_csv, name='export_attendance'),
     path('export/attendance/<int:course_id>/', web_views.export_attendance_csv, name='export_course_attendance'),
+    path('export/jobs/', web_views.create_export_job, name='export_jobs'),
+    path('export/jobs/<str:job_id>/', web_views.export_job_status, name='export_job_status'),
+    path('export/jobs/<str:job_id>/download/', web_views.download_export_job, name='export_job_download'),
     
     # Edit/Action routes
     path('system/students/<int:student_id>/edit/', web_views.edit_student, name='edit_student'),
@@ -43,5 +47,7 @@ urlpatterns = [
     path('system/lecturers/<int:lecturer_id>/toggle/', web_views.toggle_lecturer_status, name='toggle_lecturer_status'),
     path('system/students/<int:student_id>/barcode/', web_views.generate_student_barcode, name='generate_barcode'),
     path('system/students/<int:student_id>/show-barcode/', web_views.show_barcode, name='show_barcode'),
+    path('system/students/barcode-sheets.pdf', web_views.barcode_sheets_pdf, name='barcode_sheets'),
     path('barcode/<int:student_id>.png', web_views.serve_barcode_image, name='serve_barcode'),
+    path('barcode/<int:student_id>.svg', web_views.serve_barcode_image, {'fmt': 'svg'}, name='serve_barcode_svg'),
 ]
\ No newline at end of file
@@ -3,16 +3,37 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import (
+    JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse, Http404, HttpResponseBadRequest, HttpResponseForbidden
+)
+from django.conf import settings
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Avg
+from django.db.models import Q, Avg, Sum, Exists, OuterRef
 from datetime import datetime, timedelta
 from django.utils import timezone
-import csv
-import qrcode
-from io import BytesIO
+from django.utils.dateparse import parse_date, parse_datetime
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
+import asyncio
+import json
+import tempfile
+import time
 
-from .models import Student, Lecturer, Course, AttendanceSession, AttendanceRecord
+from .models import (
+    Student, Lecturer, Course, AttendanceSession, AttendanceRecord, CourseAttendanceSummary, ExportJob, RosterChange
+)
+from .cache import invalidate_course_rosters, invalidate_student_rosters, invalidate_user_tokens
+from .reports import count_subquery, session_records
+from .pagination import keyset_page
+from . import qr
+from .barcodes import barcode_counts
+from .id_cards import card_students, write_barcode_sheets
+from .rollups import with_average_attendance
+from .exports import (
+    ATTENDANCE_HEADER, attendance_export_rows, course_rows, lecturer_rows, student_rows, streaming_csv_response
+)
 
 
 def web_login(request):
@@ -65,8 +86,8 @@ def dashboard(request):
     ).order_by('-start_time')[:5]
     
     # Course statistics
-    courses = Course.objects.filter(lecturer=lecturer, is_active=True).annotate(
-        total_students=Count('students')
+    courses = with_average_attendance(Course.objects.filter(lecturer=lecturer, is_active=True)).annotate(
+        total_students=count_subquery(Course.students.through.objects.filter(course_id=OuterRef('pk')), 'course_id')
     )
     
     context = {
@@ -88,9 +109,10 @@ def course_list(request):
         messages.error(request, 'Access denied. Lecturer profile not found.')
         return redirect('attendance_web:login')
     
+    # Counted with subqueries: two Count()s over the to-many joins multiply each other
     courses = Course.objects.filter(lecturer=lecturer, is_active=True).annotate(
-        total_students=Count('students'),
-        total_sessions=Count('attendance_sessions')
+        total_students=count_subquery(Course.students.through.objects.filter(course_id=OuterRef('pk')), 'course_id'),
+        total_sessions=count_subquery(AttendanceSession.objects.filter(course_id=OuterRef('pk')), 'course_id')
     ).order_by('course_code')
     
     # Search functionality
@@ -130,12 +152,9 @@ def course_detail(request, course_id):
     total_sessions = sessions.count()
     active_sessions = sessions.filter(status='active').count()
     
-    # Average attendance rate
-    completed_sessions = sessions.filter(status='ended')
-    if completed_sessions.exists():
-        avg_attendance = sum(session.attendance_rate for session in completed_sessions) / completed_sessions.count()
-    else:
-        avg_attendance = 0
+    # Average attendance rate, rolled up as sessions end
+    summary = CourseAttendanceSummary.objects.filter(course=course).first()
+    avg_attendance = summary.average_attendance if summary else 0
     
     context = {
         'course': course,
@@ -169,9 +188,7 @@ def session_list(request):
         sessions = sessions.filter(course_id=course_filter)
     
     # Pagination
-    paginator = Paginator(sessions, 15)
-    page_number = request.GET.get('page')
-    sessions = paginator.get_page(page_number)
+    sessions = keyset_page(sessions, ['-start_time', 'id'], request.GET.get('cursor'), 15)
     
     # Get courses for filter
     courses = Course.objects.filter(lecturer=lecturer, is_active=True).order_by('course_code')
@@ -195,18 +212,22 @@ def session_detail(request, session_id):
         messages.error(request, 'Access denied. Lecturer profile not found.')
         return redirect('attendance_web:login')
     
-    # Get attendance records
-    records = AttendanceRecord.objects.filter(session=session).select_related('student').order_by('student__student_id')
+    # Live updates resume from the moment the page data was read
+    events_since = timezone.now()
+    
+    # Get attendance records, including derived absences
+    records = sorted(session_records(session), key=lambda record: record.student.student_id)
     
     # Statistics
-    total_students = records.count()
-    present_count = records.filter(status='present').count()
-    late_count = records.filter(status='late').count()
-    absent_count = records.filter(status='absent').count()
+    total_students = len(records)
+    present_count = sum(1 for record in records if record.status == 'present')
+    late_count = sum(1 for record in records if record.status == 'late')
+    absent_count = sum(1 for record in records if record.status == 'absent')
     
     context = {
         'session': session,
         'records': records,
+        'events_since': events_since.isoformat(),
         'total_students': total_students,
         'present_count': present_count,
         'late_count': late_count,
@@ -216,6 +237,113 @@ def session_detail(request, session_id):
     return render(request, 'attendance/session_detail.html', context)
 
 
+def _request_lecturer(request):
+    if not request.user.is_authenticated:
+        return None
+    try:
+        return request.user.lecturer
+    except Lecturer.DoesNotExist:
+        return None
+
+
+def _parse_event_cursor(value):
+    """Parse a ``<updated_at>|<pk>`` cursor sent back by the browser"""
+    timestamp, _, pk = (value or '').partition('|')
+    updated_at = parse_datetime(timestamp)
+    if updated_at is None:
+        return None
+    return updated_at, int(pk) if pk.isdigit() else 0
+
+
+def _sse(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def _session_event_stream(session, cursor):
+    """
+    Yield a Server-Sent Event for every record change of a session.
+
+    Changed records are polled with a keyset query on (updated_at, id), so
+    each poll is an index range scan whatever the size of the session.
+
+    The stream ends after ``SESSION_EVENTS_MAX_SECONDS``: Django does not
+    notice a client that went away while streaming, so an unbounded stream
+    would keep polling for closed tabs. Open pages reconnect and resume from
+    ``Last-Event-ID``.
+    """
+    poll_interval = getattr(settings, 'SESSION_EVENTS_POLL_INTERVAL', 1)
+    heartbeat = getattr(settings, 'SESSION_EVENTS_HEARTBEAT', 15)
+    deadline = time.monotonic() + getattr(settings, 'SESSION_EVENTS_MAX_SECONDS', 300)
+    updated_at, pk = cursor
+    idle = 0
+
+    yield 'retry: 3000\n\n'
+    while time.monotonic() < deadline:
+        records = AttendanceRecord.objects.filter(
+            Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, pk__gt=pk),
+            session=session,
+        ).select_related('student').order_by('updated_at', 'pk')[:200]
+
+        changed = False
+        async for record in records:
+            changed = True
+            updated_at, pk = record.updated_at, record.pk
+            yield _sse('record', {
+                'student': record.student_id,
+                'student_id': record.student.student_id,
+                'name': f"{record.student.first_name} {record.student.last_name}",
+                'program': record.student.program,
+                'status': record.status,
+                'check_in_time': record.check_in_time.isoformat() if record.check_in_time else None,
+            }, event_id=f'{updated_at.isoformat()}|{pk}')
+
+        if changed:
+            idle = 0
+            continue
+
+        status = await AttendanceSession.objects.filter(pk=session.pk).values_list('status', flat=True).afirst()
+        if status != 'active':
+            yield _sse('end', {'status': status})
+            return
+
+        idle += poll_interval
+        if idle >= heartbeat:
+            idle = 0
+            yield ': keepalive\n\n'
+        await asyncio.sleep(poll_interval)
+
+
+async def session_events(request, session_id):
+    """
+    Live check-ins of a session as a Server-Sent Events stream.
+
+    Needs the ASGI server; the stream resumes from ``Last-Event-ID`` when the
+    browser reconnects, or from the ``since`` cursor embedded in the page.
+    """
+    lecturer = await sync_to_async(_request_lecturer)(request)
+    if lecturer is None:
+        return HttpResponseForbidden()
+
+    session = await AttendanceSession.objects.filter(session_id=session_id, lecturer=lecturer).afirst()
+    if session is None:
+        raise Http404
+
+    cursor = (
+        _parse_event_cursor(request.headers.get('Last-Event-ID'))
+        or _parse_event_cursor(request.GET.get('since'))
+        or (timezone.now(), 0)
+    )
+
+    response = StreamingHttpResponse(_session_event_stream(session, cursor), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def student_list(request):
     try:
@@ -225,8 +353,10 @@ def student_list(request):
         return redirect('attendance_web:login')
     
     # Get all students from lecturer's courses
-    course_ids = Course.objects.filter(lecturer=lecturer, is_active=True).values_list('id', flat=True)
-    students = Student.objects.filter(courses__in=course_ids, is_active=True).distinct().order_by('student_id')
+    enrolled = Course.students.through.objects.filter(
+        student_id=OuterRef('pk'), course__lecturer=lecturer, course__is_active=True
+    )
+    students = Student.objects.filter(Exists(enrolled), is_active=True).order_by('student_id')
     
     # Search functionality
     search_query = request.GET.get('search')
@@ -284,6 +414,9 @@ def admin_dashboard(request):
     total_students = Student.objects.filter(is_active=True).count()
     total_courses = Course.objects.filter(is_active=True).count()
     active_sessions = AttendanceSession.objects.filter(status='active').count()
+    rollup = CourseAttendanceSummary.objects.aggregate(rate_sum=Sum('rate_sum'), sessions=Sum('sessions'))
+    avg_attendance = rollup['rate_sum'] / rollup['sessions'] if rollup['sessions'] else 0
+    barcodes = barcode_counts()
     
     # Recent activities
     recent_sessions = AttendanceSession.objects.all().order_by('-start_time')[:5]
@@ -295,6 +428,10 @@ def admin_dashboard(request):
         'total_students': total_students,
         'total_courses': total_courses,
         'active_sessions': active_sessions,
+        'avg_attendance': avg_attendance,
+        'pending_barcodes': barcodes['pending'],
+        'failed_barcodes': barcodes['failed'],
+        'unclaimed_exports': ExportJob.unclaimed().count(),
         'recent_sessions': recent_sessions,
         'recent_users': recent_users,
     }
@@ -389,15 +526,23 @@ def manage_students(request):
             Q(program__icontains=search_query)
         )
     
-    # Pagination
-    paginator = Paginator(students, 20)
-    page_number = request.GET.get('page')
-    students = paginator.get_page(page_number)
+    # Pagination; only search results are counted, as a count of every student scans the table
+    students_count = students.count() if search_query else None
+    students = keyset_page(students, ['student_id'], request.GET.get('cursor'), 20)
     
     context = {
         'students': students,
+        'students_count': students_count,
         'search_query': search_query,
+        'courses': Course.objects.filter(is_active=True).order_by('course_code').only('id', 'course_code', 'course_name'),
     }
+
+    # Barcode sheets queued by barcode_sheets_pdf(), polled by the page until they are written
+    sheets_job = request.GET.get('sheets_job')
+    if sheets_job:
+        job = ExportJob.objects.filter(job_id=sheets_job, kind='barcode_sheets').first()
+        if job is not None and job.can_access(request.user):
+            context['sheets_job'] = _export_job_data(job)
     
     return render(request, 'attendance/manage_students.html', context)
 
@@ -513,79 +658,33 @@ def add_course(request):
 @user_passes_test(is_admin)
 def export_students_csv(request):
     """Export all students to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="students_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Student ID', 'First Name', 'Last Name', 'Email', 'Program', 'Level', 'Status', 'Created Date'])
-    
-    students = Student.objects.filter(is_active=True).order_by('student_id')
-    for student in students:
-        writer.writerow([
-            student.student_id,
-            student.first_name,
-            student.last_name,
-            student.email,
-            student.program,
-            student.level,
-            'Active' if student.is_active else 'Inactive',
-            student.created_at.strftime('%Y-%m-%d')
-        ])
-    
-    return response
+    return streaming_csv_response(
+        request, 'students_export.csv',
+        ['Student ID', 'First Name', 'Last Name', 'Email', 'Program', 'Level', 'Status', 'Created Date'],
+        student_rows()
+    )
 
 
 @login_required
 @user_passes_test(is_admin)
 def export_lecturers_csv(request):
     """Export all lecturers to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="lecturers_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Lecturer ID', 'First Name', 'Last Name', 'Email', 'Username', 'Department', 'Status', 'Created Date'])
-    
-    lecturers = Lecturer.objects.select_related('user').order_by('lecturer_id')
-    for lecturer in lecturers:
-        writer.writerow([
-            lecturer.lecturer_id,
-            lecturer.user.first_name,
-            lecturer.user.last_name,
-            lecturer.user.email,
-            lecturer.user.username,
-            lecturer.department,
-            'Active' if lecturer.user.is_active else 'Inactive',
-            lecturer.created_at.strftime('%Y-%m-%d')
-        ])
-    
-    return response
+    return streaming_csv_response(
+        request, 'lecturers_export.csv',
+        ['Lecturer ID', 'First Name', 'Last Name', 'Email', 'Username', 'Department', 'Status', 'Created Date'],
+        lecturer_rows()
+    )
 
 
 @login_required
 @user_passes_test(is_admin)
 def export_courses_csv(request):
     """Export all courses to CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="courses_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Course Code', 'Course Name', 'Lecturer', 'Department', 'Credit Hours', 'Semester', 'Academic Year', 'Total Students', 'Status'])
-    
-    courses = Course.objects.filter(is_active=True).select_related('lecturer').order_by('course_code')
-    for course in courses:
-        writer.writerow([
-            course.course_code,
-            course.course_name,
-            f"{course.lecturer.user.first_name} {course.lecturer.user.last_name}",
-            course.lecturer.department,
-            course.credit_hours,
-            course.semester,
-            course.academic_year,
-            course.students.count(),
-            'Active' if course.is_active else 'Inactive'
-        ])
-    
-    return response
+    return streaming_csv_response(
+        request, 'courses_export.csv',
+        ['Course Code', 'Course Name', 'Lecturer', 'Department', 'Credit Hours', 'Semester', 'Academic Year', 'Total Students', 'Status'],
+        course_rows()
+    )
 
 
 @login_required
@@ -596,8 +695,6 @@ def export_attendance_csv(request, course_id=None):
         messages.error(request, 'Access denied.')
         return redirect('attendance_web:login')
     
-    response = HttpResponse(content_type='text/csv')
-    
     if course_id:
         try:
             course = Course.objects.get(id=course_id)
@@ -620,27 +717,71 @@ def export_attendance_csv(request, course_id=None):
         filename = "attendance_all_courses.csv"
         sessions = AttendanceSession.objects.all()
     
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Date', 'Course Code', 'Course Name', 'Session Name', 'Student ID', 'Student Name', 'Status', 'Check-in Time', 'Lecturer'])
-    
-    for session in sessions.select_related('course', 'lecturer').order_by('-date'):
-        records = AttendanceRecord.objects.filter(session=session).select_related('student')
-        for record in records:
-            writer.writerow([
-                session.date.strftime('%Y-%m-%d'),
-                session.course.course_code,
-                session.course.course_name,
-                session.session_name or f"Session {session.date}",
-                record.student.student_id,
-                f"{record.student.first_name} {record.student.last_name}",
-                record.status.title(),
-                record.check_in_time.strftime('%Y-%m-%d %H:%M:%S') if record.check_in_time else '',
-                f"{session.lecturer.user.first_name} {session.lecturer.user.last_name}"
-            ])
-    
-    return response
+    return streaming_csv_response(request, filename, ATTENDANCE_HEADER, attendance_export_rows(sessions))
+
+
+def _export_job_data(job):
+    return {
+        'job_id': job.job_id,
+        'status': job.status,
+        'unclaimed': job.is_unclaimed,
+        'progress': job.progress,
+        'rows_written': job.rows_written,
+        'total_rows': job.total_rows,
+        'filename': job.filename,
+        'error': job.error,
+        'status_url': reverse('attendance_web:export_job_status', args=[job.job_id]),
+        'download_url': reverse('attendance_web:export_job_download', args=[job.job_id]) if job.status == 'done' else None,
+    }
+
+
+@login_required
+@require_POST
+def create_export_job(request):
+    """Queue a background attendance export for a course, a date range or everything"""
+    course = None
+    course_id = request.POST.get('course')
+    if course_id:
+        course = Course.objects.filter(id=course_id).select_related('lecturer').first()
+        if course is None:
+            return JsonResponse({'error': 'Course not found.'}, status=404)
+        if not request.user.is_superuser and course.lecturer.user_id != request.user.pk:
+            return JsonResponse({'error': 'Access denied to this course.'}, status=403)
+    elif not request.user.is_superuser:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+
+    dates = {}
+    for field in ('start_date', 'end_date'):
+        value = request.POST.get(field)
+        try:
+            dates[field] = parse_date(value) if value else None
+        except ValueError:
+            dates[field] = None
+        if value and dates[field] is None:
+            return JsonResponse({'error': 'Dates must be in YYYY-MM-DD format.'}, status=400)
+
+    job = ExportJob.request_export(
+        request.user, course=course, compress=request.POST.get('compress') in ('1', 'true', 'on'), **dates
+    )
+    return JsonResponse(_export_job_data(job), status=202)
+
+
+@login_required
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob.objects.select_related('course__lecturer'), job_id=job_id)
+    if not job.can_access(request.user):
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    return JsonResponse(_export_job_data(job))
+
+
+@login_required
+def download_export_job(request, job_id):
+    job = get_object_or_404(ExportJob.objects.select_related('course__lecturer'), job_id=job_id)
+    if not job.can_access(request.user):
+        return HttpResponseForbidden('Access denied.')
+    if job.status != 'done' or not job.file:
+        raise Http404('Export is not ready.')
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename, content_type=job.content_type)
 
 
 # Edit/View/Delete Actions
@@ -661,6 +802,8 @@ def edit_student(request, student_id):
         
         try:
             student.save()
+            invalidate_student_rosters(student.id)
+            RosterChange.record_student_changes([student.id])
             messages.success(request, f'Student {student.first_name} {student.last_name} updated successfully!')
             return redirect('attendance_web:manage_students')
         except Exception as e:
@@ -690,6 +833,7 @@ def edit_lecturer(request, lecturer_id):
         try:
             lecturer.user.save()
             lecturer.save()
+            invalidate_user_tokens(lecturer.user_id)
             messages.success(request, f'Lecturer {lecturer.user.first_name} {lecturer.user.last_name} updated successfully!')
             return redirect('attendance_web:manage_lecturers')
         except Exception as e:
@@ -717,13 +861,18 @@ def manage_course_students(request, course_id):
             for student_id in student_ids:
                 student = Student.objects.get(id=student_id)
                 course.students.add(student)
+            RosterChange.record(course.id, 'added', map(int, student_ids))
             messages.success(request, f'Enrolled {len(student_ids)} students in {course.course_code}')
         elif action == 'remove':
             for student_id in student_ids:
                 student = Student.objects.get(id=student_id)
                 course.students.remove(student)
+            RosterChange.record(course.id, 'removed', map(int, student_ids))
             messages.success(request, f'Removed {len(student_ids)} students from {course.course_code}')
         
+        invalidate_course_rosters(course.id)
+        # Ended sessions keep the enrollment they were taken with
+        AttendanceSession.objects.filter(course=course, status='active').refresh_counters()
         return redirect('attendance_web:manage_course_students', course_id=course_id)
     
     # Get enrolled and available students
@@ -749,6 +898,8 @@ def toggle_student_status(request, student_id):
     student = get_object_or_404(Student, id=student_id)
     student.is_active = not student.is_active
     student.save()
+    invalidate_student_rosters(student.id)
+    RosterChange.record_student_changes([student.id])
     
     status = "activated" if student.is_active else "deactivated"
     messages.success(request, f'Student {student.first_name} {student.last_name} {status} successfully!')
@@ -762,6 +913,7 @@ def toggle_lecturer_status(request, lecturer_id):
     lecturer = get_object_or_404(Lecturer, id=lecturer_id)
     lecturer.user.is_active = not lecturer.user.is_active
     lecturer.user.save()
+    invalidate_user_tokens(lecturer.user_id)
     
     status = "activated" if lecturer.user.is_active else "deactivated"
     messages.success(request, f'Lecturer {lecturer.user.first_name} {lecturer.user.last_name} {status} successfully!')
@@ -800,6 +952,46 @@ def generate_student_barcode(request, student_id):
     return redirect('attendance_web:manage_students')
 
 
+@login_required
+@user_passes_test(is_admin)
+def barcode_sheets_pdf(request):
+    """
+    A4 sheets of ID cards with QR codes, for students selected by
+    ``?course=<id>``, ``?program=`` and ``?level=``.
+
+    Up to ``BARCODE_SHEETS_SYNC_LIMIT`` students are rendered in this
+    process, to a temporary file streamed from there. Larger runs are
+    queued as an export job for the export worker, and the student page
+    polls it and offers the PDF once it is written.
+    """
+    course_id = request.GET.get('course')
+    if course_id and not course_id.isdigit():
+        return HttpResponseBadRequest('course must be a course id.')
+    program, level = request.GET.get('program'), request.GET.get('level')
+    limit = getattr(settings, 'BARCODE_SHEETS_SYNC_LIMIT', 500)
+    # One row past the limit tells whether the run is too large, without loading it all
+    students = list(card_students(course_id, program, level)[:limit + 1])
+    if not students:
+        messages.warning(request, 'No students match the selected course, program and level.')
+        return redirect('attendance_web:manage_students')
+
+    if len(students) > limit:
+        course = Course.objects.filter(pk=course_id).first() if course_id else None
+        job = ExportJob.request_export(request.user, course=course, kind='barcode_sheets', program=program, level=level)
+        messages.info(request, f'More than {limit} students match, so the barcode sheets are being prepared in the background.')
+        return redirect(f"{reverse('attendance_web:manage_students')}?sheets_job={job.job_id}")
+
+    output = tempfile.TemporaryFile()
+    try:
+        write_barcode_sheets(output, students)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    # FileResponse closes, and so deletes, the temporary file once it is sent
+    return FileResponse(output, as_attachment=True, filename='barcode_sheets.pdf', content_type='application/pdf')
+
+
 @login_required
 @user_passes_test(is_admin)
 def show_barcode(request, student_id):
@@ -814,25 +1006,31 @@ def show_barcode(request, student_id):
 
 
 @login_required
-def serve_barcode_image(request, student_id):
-    """Serve barcode image dynamically without file storage"""
-    student = get_object_or_404(Student, id=student_id)
-    
-    # Generate QR code on-demand
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(student.barcode_id)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Return image as HTTP response
-    buffer = BytesIO()
-    img.save(buffer, 'PNG')
-    buffer.seek(0)
-    
-    return HttpResponse(buffer.getvalue(), content_type='image/png')
\ No newline at end of file
+def serve_barcode_image(request, student_id, fmt='png'):
+    """
+    Serve a student's QR code from the render cache.
+
+    ``?size=`` sets the pixels per module. URLs carrying the current
+    ``?v=<barcode_version>`` are cached by browsers for a year; others must
+    revalidate, and a matching ETag gets a 304 without rendering anything.
+    """
+    barcode_id = Student.objects.filter(id=student_id).values_list('barcode_id', flat=True).first()
+    if barcode_id is None:
+        raise Http404('Student not found.')
+    try:
+        size = int(request.GET.get('size', qr.DEFAULT_SIZE))
+    except ValueError:
+        size = 0
+    if not 1 <= size <= qr.MAX_SIZE:
+        return HttpResponseBadRequest(f'size must be between 1 and {qr.MAX_SIZE}.')
+
+    etag = qr.render_etag(barcode_id, size, fmt)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(qr.get_qr_image(barcode_id, size, fmt), content_type=qr.CONTENT_TYPES[fmt])
+    response['ETag'] = etag
+    if request.GET.get('v') == Student.version_of(barcode_id):
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
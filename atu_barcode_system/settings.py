@@ -129,7 +129,8 @@ STATICFILES_DIRS = [BASE_DIR / 'static'] if (BASE_DIR / 'static').exists() else
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
+# Export files and barcode images; the web service and the workers must share it
+MEDIA_ROOT = Path(os.environ.get('MEDIA_ROOT', BASE_DIR / 'media'))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -140,16 +141,72 @@ LOGOUT_REDIRECT_URL = '/login/'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'attendance.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Keyset pagination over each list view's keyset_ordering
+    'DEFAULT_PAGINATION_CLASS': 'attendance.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
 }
 
+# Store an absent record for every enrolled student when a session starts.
+# When False only check-ins, late and excused marks are stored and absences
+# are derived from the enrollment at read time.
+ATTENDANCE_MATERIALIZE_ABSENCES = os.environ.get('ATTENDANCE_MATERIALIZE_ABSENCES', 'False').lower() == 'true'
+
+# Per-process cache of active session rosters used to validate scans
+ROSTER_CACHE_SIZE = int(os.environ.get('ROSTER_CACHE_SIZE', 256))
+ROSTER_CACHE_TTL = int(os.environ.get('ROSTER_CACHE_TTL', 60))  # seconds
+
+# Repeat scans of a student within this window are answered from memory
+SCAN_DEBOUNCE_SECONDS = int(os.environ.get('SCAN_DEBOUNCE_SECONDS', 120))
+SCAN_DEBOUNCE_CACHE_SIZE = 20000
+
+# Offline scans timed further ahead of the server clock than this are rejected
+SCAN_CLOCK_SKEW_SECONDS = int(os.environ.get('SCAN_CLOCK_SKEW_SECONDS', 120))
+
+# Scanner retries sent with the same Idempotency-Key are never applied twice
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # seconds
+IDEMPOTENCY_CACHE_SIZE = 20000
+
+# Live session updates (Server-Sent Events, served by the ASGI application)
+SESSION_EVENTS_POLL_INTERVAL = 1  # seconds between checks for new check-ins
+SESSION_EVENTS_HEARTBEAT = 15  # seconds between keep-alive comments
+SESSION_EVENTS_MAX_SECONDS = 300  # streams end after this and the browser reconnects
+
+# Background attendance exports (python manage.py run_export_worker)
+EXPORT_JOB_TTL = 15 * 60  # seconds an identical export reuses the same job
+EXPORT_JOB_RETENTION = 24 * 60 * 60  # seconds before jobs and their files are purged
+EXPORT_JOB_STALE_AFTER = 10 * 60  # seconds without progress before a running job is retried
+EXPORT_JOB_UNCLAIMED_AFTER = 60  # seconds a queued job waits before it is reported as unclaimed
+EXPORT_WORKER_POLL_INTERVAL = 2  # seconds
+
+# Barcode images are generated in the background (python manage.py process_barcodes)
+BARCODE_BATCH_SIZE = 200  # students claimed and written back together
+BARCODE_WORKERS = int(os.environ.get('BARCODE_WORKERS', 0)) or None  # rendering processes, default one per CPU
+BARCODE_WORKER_POLL_INTERVAL = 5  # seconds
+# Printable barcode sheets for more students than this are queued as export
+# jobs for the export worker instead of being rendered inside the request
+BARCODE_SHEETS_SYNC_LIMIT = int(os.environ.get('BARCODE_SHEETS_SYNC_LIMIT', 500))
+
+# Per-process cache of API tokens and their user and lecturer. Logout and
+# lecturer changes clear it in the process that handled them; other workers
+# pick them up within the TTL.
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))  # seconds
+
+# Rendered QR codes: an in-process LRU of this many images, backed by
+# content-addressed files in QR_RENDER_CACHE_DIR (None keeps memory only)
+QR_RENDER_CACHE_SIZE = 4096
+QR_RENDER_CACHE_DIR = MEDIA_ROOT / 'qr_cache'
+
+# Change feeds leave out rows updated in the last few seconds, whose
+# transactions may not have committed yet
+CHANGE_FEED_SETTLE_SECONDS = 5
+
 # CORS - allow all origins for now
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOWED_HEADERS = [
@@ -158,6 +215,7 @@ CORS_ALLOWED_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',